@@ -0,0 +1,163 @@
+"""
+Compare how many concurrent connections one worker sustains on the WSGI
+stack (gunicorn.conf.py, threaded workers) and on the ASGI stack
+(gunicorn_asgi.conf.py, Uvicorn workers).
+
+The API's rate limits would otherwise answer almost every request with 429
+and the benchmark would measure the throttle, so lift them for both servers
+and start each with a single worker, e.g.
+
+    export THROTTLE_RATE_ANON=1000000/second THROTTLE_RATE_USER=1000000/second
+    gunicorn -c gunicorn.conf.py -w 1 -b 127.0.0.1:8010 eduloop.wsgi:application
+    gunicorn -c gunicorn_asgi.conf.py -w 1 -b 127.0.0.1:8011 eduloop.asgi:application
+
+then run ``python asgi_benchmark.py``. The quiz scenario starts runs and
+draws questions, so it needs credentials: set ``BENCHMARK_AUTHORIZATION`` to
+an Authorization header value such as ``Token <key>`` (a user's DRF token;
+``AccessKey`` tokens share one seen history, which the benchmark would use
+up), and ``BENCHMARK_GROUP_ID``/``BENCHMARK_SUBJECT_ID`` to a subject with
+questions. Without credentials only the taxonomy lists are measured.
+
+Every concurrency level keeps that many connections busy for DURATION
+seconds and reports throughput, latency, failures and throttled (429)
+responses per stack and scenario.
+"""
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Configuration
+STACKS = {
+    'wsgi': ('http://127.0.0.1:8010/api', {
+        'groups': '/groups/',
+        'subjects': '/subject/1/',
+        'categories': '/categories/1/',
+        'quiz': '/questions/',
+    }),
+    'asgi': ('http://127.0.0.1:8011/api', {
+        'groups': '/async/groups/',
+        'subjects': '/async/subject/1/',
+        'categories': '/async/categories/1/',
+        'quiz': '/async/questions/',
+    }),
+}
+CONCURRENCY_LEVELS = [10, 50, 100, 250, 500]
+DURATION = 15
+TIMEOUT = 10
+MAX_ERROR_RATE = 1.0  # percent; a level "holds" while failures stay below this
+QUIZ_STEPS = 5  # questions drawn per quiz run
+
+AUTHORIZATION = os.environ.get('BENCHMARK_AUTHORIZATION')
+QUIZ_FILTERS = {
+    'group_id': int(os.environ.get('BENCHMARK_GROUP_ID', 1)),
+    'subject_id': int(os.environ.get('BENCHMARK_SUBJECT_ID', 1)),
+}
+
+OK, THROTTLED, FAILED = 'ok', 'throttled', 'failed'
+
+
+def timed(results, request, accepted=(200,)):
+    """Send ``request()``, record its outcome and latency, and return the response or None."""
+    start_time = time.time()
+    try:
+        response = request()
+    except requests.RequestException:
+        response = None
+    if response is None:
+        outcome = FAILED
+    elif response.status_code == 429:
+        outcome = THROTTLED
+    else:
+        outcome = OK if response.status_code in accepted else FAILED
+    results.append((outcome, time.time() - start_time))
+    return response if outcome == OK else None
+
+
+def list_round(session, base_url, endpoints, results):
+    for name in ('groups', 'subjects', 'categories'):
+        timed(results, lambda: session.get(f"{base_url}{endpoints[name]}", timeout=TIMEOUT))
+
+
+def quiz_round(session, base_url, endpoints, results):
+    url = f"{base_url}{endpoints['quiz']}"
+    response = timed(results, lambda: session.post(url, json=QUIZ_FILTERS, timeout=TIMEOUT))
+    if response is None:
+        return
+    headers = {'X-Session-Id': response.json()['session_id']}
+    for _ in range(QUIZ_STEPS):
+        # 404 is the answer once the run has served every question.
+        if timed(results, lambda: session.get(url, headers=headers, timeout=TIMEOUT), accepted=(200, 404)) is None:
+            break
+    timed(results, lambda: session.delete(url, headers=headers, timeout=TIMEOUT))
+
+
+SCENARIOS = {'lists': list_round, 'quiz': quiz_round}
+
+
+def run_connection(scenario, base_url, endpoints, deadline, results, lock):
+    session = requests.Session()
+    if AUTHORIZATION:
+        session.headers['Authorization'] = AUTHORIZATION
+    local = []
+    while time.time() < deadline:
+        scenario(session, base_url, endpoints, local)
+    with lock:
+        results.extend(local)
+
+
+def run_level(scenario, base_url, endpoints, concurrency):
+    results = []
+    lock = threading.Lock()
+    deadline = time.time() + DURATION
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(run_connection, scenario, base_url, endpoints, deadline, results, lock)
+
+    latencies = sorted(elapsed for outcome, elapsed in results if outcome == OK)
+    failed = sum(1 for outcome, _elapsed in results if outcome == FAILED)
+    throttled = sum(1 for outcome, _elapsed in results if outcome == THROTTLED)
+    return {
+        'requests': len(results),
+        'rps': len(results) / DURATION,
+        'error_rate': (failed / len(results)) * 100 if results else 100.0,
+        'throttled': throttled,
+        'median': statistics.median(latencies) if latencies else 0,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0,
+    }
+
+
+def main():
+    scenarios = SCENARIOS if AUTHORIZATION else {'lists': list_round}
+    if not AUTHORIZATION:
+        print("BENCHMARK_AUTHORIZATION is not set; skipping the quiz scenario.")
+
+    capacity = {}
+    throttled = False
+    for name, (base_url, endpoints) in STACKS.items():
+        for scenario_name, scenario in scenarios.items():
+            print(f"\n{name.upper()} {scenario_name} ({base_url})")
+            print(f"{'conns':>6} {'req/s':>9} {'failed':>8} {'429s':>7} {'median':>9} {'p95':>9}")
+            capacity[name, scenario_name] = 0
+            for concurrency in CONCURRENCY_LEVELS:
+                stats = run_level(scenario, base_url, endpoints, concurrency)
+                print(f"{concurrency:>6} {stats['rps']:>9.1f} {stats['error_rate']:>7.2f}% {stats['throttled']:>7} "
+                      f"{stats['median'] * 1000:>7.1f}ms {stats['p95'] * 1000:>7.1f}ms")
+                throttled = throttled or stats['throttled'] > 0
+                if stats['error_rate'] < MAX_ERROR_RATE and not stats['throttled']:
+                    capacity[name, scenario_name] = concurrency
+
+    print("\nConcurrent connections held per worker (failures below "
+          f"{MAX_ERROR_RATE}%, no 429s):")
+    for (name, scenario_name), connections in capacity.items():
+        print(f"{name} {scenario_name}: {connections}")
+    if throttled:
+        print("\nSome responses were throttled (429); raise THROTTLE_RATE_ANON and "
+              "THROTTLE_RATE_USER on both servers, or the results measure the rate limit.")
+
+
+if __name__ == '__main__':
+    main()
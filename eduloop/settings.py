@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Rest framework
     'rest_framework',
@@ -116,6 +117,46 @@ CACHES = {
 }
 }
 
+# Quiz sampling: how often (seconds) each worker checks the database for
+# question changes before serving from its in-process question index.
+QUESTION_INDEX_REFRESH_SECONDS = config('QUESTION_INDEX_REFRESH_SECONDS', default=5, cast=int)
+# Each refresh re-reads questions stamped this many seconds before the newest
+# one it has seen, to catch transactions that commit late and hosts whose
+# clock runs behind.
+QUESTION_INDEX_SYNC_LAG_SECONDS = config('QUESTION_INDEX_SYNC_LAG_SECONDS', default=QUESTION_INDEX_REFRESH_SECONDS * 2, cast=int)
+
+# Quiz runs live in Redis (see questions/quiz_state.py) and expire after
+# this many seconds without activity.
+QUIZ_STATE_TTL = config('QUIZ_STATE_TTL', default=60 * 60 * 24, cast=int)
+# Questions a student (access token) has already seen, kept across sessions.
+QUIZ_SEEN_TTL = config('QUIZ_SEEN_TTL', default=60 * 60 * 24 * 90, cast=int)
+# Rendered question JSON kept per worker in front of the Redis payload cache.
+QUESTION_PAYLOAD_LRU_SIZE = config('QUESTION_PAYLOAD_LRU_SIZE', default=4096, cast=int)
+# Cached list responses are keyed on per-model generation counters
+# (questions/generations.py), so this TTL only bounds memory, not staleness.
+VIEW_CACHE_TTL = config('VIEW_CACHE_TTL', default=60 * 60 * 6, cast=int)
+# Paginated lists report PostgreSQL's row estimate instead of an exact
+# COUNT(*) once a result is expected to exceed this many rows.
+ESTIMATED_COUNT_THRESHOLD = config('ESTIMATED_COUNT_THRESHOLD', default=10000, cast=int)
+# List pages with at least this many rows are streamed as JSON rather than
+# rendered and compressed in one piece.
+STREAMING_MIN_PAGE_SIZE = config('STREAMING_MIN_PAGE_SIZE', default=50, cast=int)
+
+# Quiz packs: prebuilt gzipped question bundles per filter (questions/quiz_packs.py).
+QUIZ_PACK_ROOT = config('QUIZ_PACK_ROOT', default=str(BASE_DIR / 'quiz_packs'))
+# Hand pack downloads to nginx (location /internal/quiz-packs/) instead of
+# streaming them from Django.
+QUIZ_PACK_ACCEL_REDIRECT = config('QUIZ_PACK_ACCEL_REDIRECT', default=False, cast=bool)
+QUIZ_PACK_MAX_QUESTIONS = config('QUIZ_PACK_MAX_QUESTIONS', default=2000, cast=int)
+QUIZ_PACK_MAX_AGE = config('QUIZ_PACK_MAX_AGE', default=300, cast=int)
+
+# Background question imports (questions/import_jobs.py): uploads are stored
+# here until a `manage.py run_import_jobs` worker has imported them.
+IMPORT_JOB_ROOT = config('IMPORT_JOB_ROOT', default=str(BASE_DIR / 'import_jobs'))
+# A running job with no heartbeat for this many seconds is claimed again.
+IMPORT_JOB_STALE_AFTER = config('IMPORT_JOB_STALE_AFTER', default=300, cast=int)
+IMPORT_JOB_MAX_ATTEMPTS = config('IMPORT_JOB_MAX_ATTEMPTS', default=3, cast=int)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -182,6 +223,11 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'questions.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DATETIME_FORMAT': "%Y-%m-%dT%H:%M:%SZ",
@@ -192,9 +238,10 @@ REST_FRAMEWORK = {
         'rest_framework.throttling.AnonRateThrottle',
         'rest_framework.throttling.UserRateThrottle'
     ],
+    # Overridable from the environment, e.g. to lift them for asgi_benchmark.py.
     'DEFAULT_THROTTLE_RATES': {
-        'anon': '200/minute',      # Increased for better UX
-        'user': '500/minute',      # Higher for authenticated users
+        'anon': config('THROTTLE_RATE_ANON', default='200/minute'),      # Increased for better UX
+        'user': config('THROTTLE_RATE_USER', default='500/minute'),      # Higher for authenticated users
         'burst': '50/10sec',       # Handle traffic bursts
     }  
 }   
@@ -10,6 +10,14 @@ bind = "0.0.0.0:8010"
 # workers = multiprocessing.cpu_count() * 2 + 1
 workers = 3  # আপাতত আমরা ৩ দিয়ে শুরু করতে পারি
 
+# Threaded workers. The worker timeout only watches each worker's main loop,
+# which keeps running while a thread serves a request, so the streamed
+# question export (/api/dashboard/questions/export/) can run for as long as
+# nginx allows (proxy_read_timeout 1h) instead of being killed after 30s.
+worker_class = "gthread"
+threads = 4
+timeout = 30
+
 # The user to run as.
 # user = "www-data"  # প্রোডাকশন সার্ভারে নির্দিষ্ট ইউজার সেট করা ভালো অভ্যাস
 
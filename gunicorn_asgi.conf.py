@@ -0,0 +1,22 @@
+# gunicorn_asgi.conf.py
+#
+# ASGI deployment of the same project:
+#   gunicorn -c gunicorn_asgi.conf.py eduloop.asgi:application
+#
+# Each Uvicorn worker runs an event loop, so the async views under /api/async/
+# keep serving other connections while they wait on Postgres or Redis. The
+# regular DRF views still work here; Django runs them in a thread.
+
+bind = "0.0.0.0:8010"
+
+workers = 3
+
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Idle keep-alive connections cost an event-loop worker almost nothing.
+keepalive = 5
+
+# Logging
+accesslog = "gunicorn_access.log"
+errorlog = "gunicorn_error.log"
+loglevel = "info"
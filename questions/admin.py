@@ -1,7 +1,8 @@
 from django.contrib import admin
 from unfold.admin import ModelAdmin
-from .models import Group, Subject, Category, SubCategory, Question
+from .models import Group, Subject, Category, SubCategory, Question, ImportJob
 from django.contrib.sessions.models import Session
+from .pagination import EstimatedCountPaginator
 
 
 @admin.register(Session)
@@ -20,6 +21,7 @@ class SessionAdmin(ModelAdmin):
     list_per_page = 25
     list_filter = ('expire_date',)
     show_full_result_count = False
+    paginator = EstimatedCountPaginator
     
     # Add custom action to delete expired sessions
     actions = ['delete_expired_sessions']
@@ -69,6 +71,8 @@ class QuestionAdmin(ModelAdmin):
     list_per_page = 50
     readonly_fields = ('created_at', 'updated_at')
     list_max_show_all = 900
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
 
     raw_id_fields = ('group', 'subject', 'category', 'subcategory')
 
@@ -84,4 +88,15 @@ class QuestionAdmin(ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'group', 'subject', 'category', 'subcategory'
-        )
\ No newline at end of file
+        ).defer('search_document')
+
+@admin.register(ImportJob)
+class ImportJobAdmin(ModelAdmin):
+    list_display = ('id', 'status', 'format', 'processed_rows', 'total_rows', 'created_rows', 'failed_rows', 'attempts', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'format')
+    ordering = ('-created_at',)
+    list_per_page = 50
+    readonly_fields = [field.name for field in ImportJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,20 @@
+"""
+asyncio Redis clients for the async views.
+
+redis.asyncio connections belong to the event loop that opened them, so each
+loop gets its own pooled client for a ``CACHES`` alias.
+"""
+import asyncio
+import weakref
+
+import redis.asyncio as aioredis
+from django.conf import settings
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_redis(alias='default'):
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if alias not in clients:
+        clients[alias] = aioredis.from_url(settings.CACHES[alias]['LOCATION'])
+    return clients[alias]
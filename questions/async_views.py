@@ -0,0 +1,281 @@
+"""
+Async versions of the quiz and taxonomy read endpoints, mounted under
+``/api/async/``.
+
+They use Django's async ORM and redis.asyncio, so under an ASGI worker
+(``gunicorn -c gunicorn_asgi.conf.py eduloop.asgi:application``) a worker
+keeps serving other connections while it waits on Postgres or Redis.
+Responses match the DRF views they mirror:
+- The same ``UserRateThrottle``/``AnonRateThrottle`` rates apply, counted in
+  the same buckets.
+- The taxonomy lists share the generation-keyed ETag/304 and precompressed
+  list cache (``conditional.py``, ``generations.py``, ``compression.py``).
+Unsafe quiz methods accept ``AccessKey`` and ``Token`` authentication only
+(no session/CSRF).
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed, Throttled, ValidationError
+from rest_framework.request import Request
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from users.authentication import aauthenticate
+from users.models import AccessToken
+
+from . import compression, generations
+from .conditional import list_etag
+from .metadata import clean_metadata_filters, has_metadata_filters
+from .models import Category, Group, SubCategory, Subject
+from .payload_cache import json_list, json_response, payload_cache
+from .question_index import question_index
+from .renderers import FastJSONRenderer
+from .quiz_state import async_quiz_state, filter_hash
+from .serializers import CategoryReadSerializer, GroupSerializer, SubCategoryReadSerializer, SubjectSerializer
+from .pagination import StandardResultsSetPagination
+from .views import QUIZ_FETCH_ATTEMPTS, QUIZ_MAX_COUNT, CategoryDetailsViewSet, GroupViewSet, SubCategoryDetailsViewSet, SubjectDetailViewSet
+
+renderer = FastJSONRenderer()
+THROTTLE_CLASSES = (UserRateThrottle, AnonRateThrottle)
+
+
+def _throttle_wait(request, user):
+    # Like APIView.check_throttles: every throttle counts the request.
+    drf_request = Request(request)
+    if user is not None:
+        drf_request.user = user
+    throttles = [throttle_class() for throttle_class in THROTTLE_CLASSES]
+    waits = [throttle.wait() for throttle in throttles if not throttle.allow_request(drf_request, None)]
+    if not waits:
+        return None
+    return max((wait for wait in waits if wait is not None), default=None) or 0
+
+
+async def throttled(request, user=None):
+    """The 429 the DRF views would send when ``request`` is over its rate, else None."""
+    wait = await sync_to_async(_throttle_wait)(request, user)
+    if wait is None:
+        return None
+    response = JsonResponse({'detail': Throttled(wait).detail}, status=429)
+    if wait:
+        response['Retry-After'] = '%d' % wait
+    return response
+
+
+async def guard(request):
+    """
+    ``(user, auth, None)`` for a request that may proceed, or
+    ``(None, None, response)`` with the 401/429 to send instead.
+    """
+    try:
+        user, auth = await aauthenticate(request)
+    except AuthenticationFailed as exc:
+        return None, None, JsonResponse({'detail': exc.detail}, status=401)
+    return user, auth, await throttled(request, user)
+
+
+async def cached_list(request, name, cache_models, render):
+    """
+    A list response through the generation-keyed conditional GET and
+    precompressed cache the DRF lists use. ``render()`` is awaited only on a
+    cache miss; responses other than 200 are passed through uncached.
+    """
+    _user, _auth, response = await guard(request)
+    if response is not None:
+        return response
+    version = await generations.acurrent(*cache_models)
+    etag = list_etag(version, 'json', request.get_full_path())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        key = generations.list_cache_key(name, version, request.build_absolute_uri())
+        content, encoding = await sync_to_async(compression.get)(key, compression.accepted_encoding(request), settings.VIEW_CACHE_TTL)
+        if content is None:
+            response = await render()
+            if response.status_code != 200:
+                return response
+            content, encoding = await sync_to_async(compression.store)(key, response.content, encoding, settings.VIEW_CACHE_TTL)
+        response = compression.encoded_response(content, 'application/json', encoding)
+    response['ETag'] = f'W/{etag}' if response.has_header('Content-Encoding') else etag
+    return response
+
+
+def _positive_int(value, default):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+async def paginated_response(request, queryset, serializer_class):
+    """Render one page of ``queryset`` like ``StandardResultsSetPagination`` does."""
+    pagination = StandardResultsSetPagination
+    page_size = min(_positive_int(request.GET.get(pagination.page_size_query_param), pagination.page_size), pagination.max_page_size)
+    page = _positive_int(request.GET.get('page'), 1)
+
+    count = await queryset.acount()
+    offset = (page - 1) * page_size
+    if page > 1 and offset >= count:
+        return JsonResponse({'detail': 'Invalid page.'}, status=404)
+
+    objects = [obj async for obj in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if offset + page_size < count else None
+    if page <= 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+
+    return HttpResponse(renderer.render({
+        'count': count,
+        'next': next_url,
+        'previous': previous_url,
+        'results': serializer_class(objects, many=True).data,
+    }), content_type='application/json')
+
+
+# Taxonomy
+
+@require_GET
+async def group_list(request):
+    async def render():
+        return await paginated_response(request, Group.objects.all().order_by('name'), GroupSerializer)
+    return await cached_list(request, 'async_group_list', GroupViewSet.cache_models, render)
+
+
+@require_GET
+async def subject_list(request, group_id):
+    async def render():
+        if not await Group.objects.filter(id=group_id).aexists():
+            return JsonResponse({'detail': 'No Group matches the given query.'}, status=404)
+        queryset = Subject.objects.select_related('group').filter(group_id=group_id).order_by('group__name', 'name')
+        return await paginated_response(request, queryset, SubjectSerializer)
+    return await cached_list(request, 'async_subject_list', SubjectDetailViewSet.cache_models, render)
+
+
+@require_GET
+async def category_list(request, subject_id):
+    async def render():
+        if not await Subject.objects.filter(id=subject_id).aexists():
+            return JsonResponse({'detail': 'No Subject matches the given query.'}, status=404)
+        subcategories = SubCategory.objects.select_related('category', 'subject', 'group')
+        queryset = Category.objects.select_related('subject', 'group').prefetch_related(
+            Prefetch('subcategories', queryset=subcategories)
+        ).filter(subject_id=subject_id).order_by('name')
+        return await paginated_response(request, queryset, CategoryReadSerializer)
+    return await cached_list(request, 'async_category_list', CategoryDetailsViewSet.cache_models, render)
+
+
+@require_GET
+async def subcategory_list(request, category_id):
+    async def render():
+        if not await Category.objects.filter(id=category_id).aexists():
+            return JsonResponse({'detail': 'No Category matches the given query.'}, status=404)
+        queryset = SubCategory.objects.select_related('category', 'subject', 'group').filter(category_id=category_id).order_by('name')
+        return await paginated_response(request, queryset, SubCategoryReadSerializer)
+    return await cached_list(request, 'async_subcategory_list', SubCategoryDetailsViewSet.cache_models, render)
+
+
+# Quiz
+
+class AsyncQuestionView(View):
+    http_method_names = ['get', 'post', 'delete']
+
+    async def authenticate(self, request):
+        try:
+            return await aauthenticate(request)
+        except AuthenticationFailed as exc:
+            return None, exc.detail
+
+    def unauthorized(self, detail=None):
+        return JsonResponse({'detail': detail or 'Authentication credentials were not provided.'}, status=401)
+
+    async def post(self, request, *args, **kwargs):
+        user, auth = await self.authenticate(request)
+        if user is None:
+            return self.unauthorized(auth)
+        response = await throttled(request, user)
+        if response is not None:
+            return response
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'detail': 'JSON parse error.'}, status=400)
+
+        filters = {
+            'group_id': data.get('group_id'),
+            'subject_id': data.get('subject_id'),
+            'category_ids': data.get('category_ids', []),
+            'subcategory_ids': data.get('subcategory_ids', []),
+            'levels': data.get('levels', []),
+        }
+        if not filters['group_id'] or not filters['subject_id']:
+            return JsonResponse({"errors": "Selecting a group and at least one subject is mandatory."}, status=400)
+        if has_metadata_filters(data):
+            try:
+                filters.update(await sync_to_async(clean_metadata_filters)(data))
+            except ValidationError as exc:
+                return JsonResponse(exc.detail, status=400)
+
+        await question_index.arefresh()
+        pool = await question_index.acandidates(filters, cache_key=filter_hash(filters))
+        if not len(pool):
+            return JsonResponse({'errors': "No questions are available for your selection."}, status=404)
+
+        token_key = auth.key if isinstance(auth, AccessToken) else None
+        session_id, state = await async_quiz_state.create(filters, len(pool), token_key=token_key)
+        question_ids = await async_quiz_state.advance(session_id, state, pool)
+        payloads = await payload_cache.aget_many(question_ids)
+        first_question_data = payloads.get(question_ids[0], b'null') if question_ids else b'null'
+
+        return json_response(b'{"session_id":"%s","question":%s}' % (session_id.encode(), first_question_data))
+
+    async def get(self, request, *args, **kwargs):
+        _user, _auth, response = await guard(request)
+        if response is not None:
+            return response
+        session_id = request.headers.get('X-Session-Id')
+        state = await async_quiz_state.load(session_id)
+        if not state:
+            return JsonResponse({'errors': "There is no active question this section."}, status=400)
+
+        count = request.GET.get('count')
+        if count is not None:
+            count = _positive_int(count, 0)
+            if not 1 <= count <= QUIZ_MAX_COUNT:
+                return JsonResponse({'errors': f"count must be between 1 and {QUIZ_MAX_COUNT}."}, status=400)
+
+        await question_index.arefresh()
+        pool = await question_index.acandidates(state['filters'], cache_key=state['filter_hash'])
+
+        for _attempt in range(QUIZ_FETCH_ATTEMPTS):
+            question_ids = await async_quiz_state.advance(session_id, state, pool, count=count or 1)
+            if not question_ids:
+                break
+            payloads = await payload_cache.aget_many(question_ids)
+            if count is not None:
+                return json_response(b'{"questions":%s}' % json_list([payloads[question_id] for question_id in question_ids if question_id in payloads]))
+            if question_ids[0] in payloads:
+                return json_response(payloads[question_ids[0]])
+        return JsonResponse({'errors': "No more new questions are available for your selection."}, status=404)
+
+    async def delete(self, request, *args, **kwargs):
+        user, auth = await self.authenticate(request)
+        if user is None:
+            return self.unauthorized(auth)
+        response = await throttled(request, user)
+        if response is not None:
+            return response
+        forget_seen = request.GET.get('forget_seen', '').lower() in ('1', 'true')
+        await async_quiz_state.clear(request.headers.get('X-Session-Id'), forget_seen=forget_seen)
+        return JsonResponse({'message': "Question session has been reset."})
@@ -0,0 +1,182 @@
+"""
+Bulk question import.
+
+``BulkQuestionUploadView`` takes either one JSON list (all or nothing) or a
+stream, NDJSON (``application/x-ndjson``) or CSV (``text/csv`` with a header
+row naming the ``CSV_COLUMNS``, ``metadata`` JSON-encoded). A stream is
+parsed line by line from the request body, so ``DATA_UPLOAD_MAX_MEMORY_SIZE``
+does not apply, and imported ``IMPORT_CHUNK_SIZE`` rows at a time: taxonomy
+names are resolved for the chunk, its valid rows are inserted with
+``bulk_create(batch_size=IMPORT_BATCH_SIZE)`` in a transaction of their own,
+and only counters and the first ``MAX_REPORTED_ERRORS`` errors are kept.
+Memory stays flat however long the upload is.
+
+Rows are numbered as in the JSON upload: the first item is row 2.
+"""
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+
+from .models import Category, Group, Question, SubCategory, Subject
+
+IMPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+CSV_COLUMNS = ('group', 'subject', 'category', 'subcategory', 'level', 'type', 'metadata')
+
+
+def resolve_taxonomy(items):
+    """Map the taxonomy names used by ``items`` to their rows, four queries in all."""
+    group_names = {item.get('group') for item in items if item.get('group')}
+    subject_lookups = {(item.get('group'), item.get('subject')) for item in items}
+    category_lookups = {(item.get('group'), item.get('subject'), item.get('category')) for item in items}
+    subcategory_lookups = {(item.get('group'), item.get('subject'), item.get('category'), item.get('subcategory')) for item in items if item.get('subcategory')}
+
+    groups = Group.objects.filter(name__in=group_names)
+    subjects = Subject.objects.select_related('group').filter(group__name__in={l[0] for l in subject_lookups}, name__in={l[1] for l in subject_lookups})
+    categories = Category.objects.select_related('group', 'subject').filter(group__name__in={l[0] for l in category_lookups}, subject__name__in={l[1] for l in category_lookups}, name__in={l[2] for l in category_lookups})
+    subcategories = SubCategory.objects.select_related('group', 'subject', 'category').filter(group__name__in={l[0] for l in subcategory_lookups}, subject__name__in={l[1] for l in subcategory_lookups}, category__name__in={l[2] for l in subcategory_lookups}, name__in={l[3] for l in subcategory_lookups})
+
+    return (
+        {g.name: g for g in groups},
+        {(s.group.name, s.name): s for s in subjects},
+        {(c.group.name, c.subject.name, c.name): c for c in categories},
+        {(sc.group.name, sc.subject.name, sc.category.name, sc.name): sc for sc in subcategories},
+    )
+
+
+def build_questions(rows, taxonomy):
+    """Turn ``(index, item)`` rows into unsaved questions and ``{"row", "errors"}`` entries."""
+    groups_map, subjects_map, categories_map, subcategories_map = taxonomy
+    questions = []
+    errors = []
+    for index, item_data in rows:
+        group_name = item_data.get('group')
+        subject_name = item_data.get('subject')
+        category_name = item_data.get('category')
+        subcategory_name = item_data.get('subcategory')
+
+        group = groups_map.get(group_name)
+        if not group:
+            errors.append({"row": index + 2, "errors": {"group": f"Group '{group_name}' not found."}})
+            continue
+        subject = subjects_map.get((group_name, subject_name))
+        if not subject:
+            errors.append({"row": index + 2, "errors": {"subject": f"Subject '{subject_name}' not found in group '{group_name}'."}})
+            continue
+        category = categories_map.get((group_name, subject_name, category_name))
+        if not category:
+            errors.append({"row": index + 2, "errors": {"category": f"Category '{category_name}' not found."}})
+            continue
+
+        subcategory = None
+        if subcategory_name:
+            subcategory = subcategories_map.get((group_name, subject_name, category_name, subcategory_name))
+            if not subcategory:
+                errors.append({"row": index + 2, "errors": {"subcategory": f"SubCategory '{subcategory_name}' not found."}})
+                continue
+
+        # Columns the database would refuse, reported as row errors instead.
+        missing = {field: "This field is required." for field in ('level', 'type') if item_data.get(field) is None}
+        if missing:
+            errors.append({"row": index + 2, "errors": missing})
+            continue
+
+        metadata = item_data.get('metadata', {})
+        questions.append(Question(
+            group=group, subject=subject, category=category, subcategory=subcategory,
+            level=item_data.get('level'), type=item_data.get('type'), metadata={} if metadata is None else metadata
+        ))
+    return questions, errors
+
+
+def _lines(stream):
+    # utf-8-sig drops the byte order mark Excel writes at the start of a CSV.
+    return codecs.iterdecode(iter(stream.readline, b''), 'utf-8-sig')
+
+
+def iter_ndjson(stream):
+    """Yield ``(index, item, error)`` for each line of an NDJSON byte stream."""
+    for index, line in enumerate(_lines(stream)):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield index, None, {"json": "Invalid JSON."}
+            continue
+        if not isinstance(item, dict):
+            yield index, None, {"json": "Expected an object."}
+            continue
+        yield index, item, None
+
+
+def iter_csv(stream):
+    """Yield ``(index, item, error)`` for each data row of a CSV byte stream."""
+    reader = csv.DictReader(_lines(stream))
+    unknown = set(reader.fieldnames or ()) - set(CSV_COLUMNS)
+    if unknown or not reader.fieldnames:
+        yield -1, None, {"header": f"Expected the columns {', '.join(CSV_COLUMNS)}."}
+        return
+    for index, item in enumerate(reader):
+        # An empty cell is a missing value.
+        item = {column: value for column, value in item.items() if value}
+        try:
+            item['metadata'] = json.loads(item['metadata']) if item.get('metadata') else {}
+        except ValueError:
+            yield index, None, {"metadata": "Invalid JSON."}
+            continue
+        yield index, item, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, errors):
+        self.failed += len(errors)
+        self.errors.extend(errors[:MAX_REPORTED_ERRORS - len(self.errors)])
+
+
+def import_stream(rows, chunk_size=IMPORT_CHUNK_SIZE, report=None, on_chunk=None):
+    """
+    Import ``(index, item, error)`` rows chunk by chunk into ``report`` (a new
+    ``ImportReport`` by default) and return it. ``on_chunk(report)`` runs after
+    each chunk, in the transaction that inserted its questions when there
+    were any, so whatever it records commits with them.
+    """
+    report = report or ImportReport()
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        report.total += len(chunk)
+        errors = [{"row": index + 2, "errors": error} for index, _item, error in chunk if error]
+        valid = [(index, item) for index, item, error in chunk if not error]
+        questions = []
+        if valid:
+            questions, invalid = build_questions(valid, resolve_taxonomy([item for _index, item in valid]))
+            errors.extend(invalid)
+        report.fail(sorted(errors, key=lambda error: error["row"]))
+        if questions:
+            inserted = False
+            try:
+                with transaction.atomic():
+                    Question.objects.bulk_create(questions, batch_size=IMPORT_BATCH_SIZE)
+                    inserted = True
+                    report.created += len(questions)
+                    if on_chunk is not None:
+                        on_chunk(report)
+                continue
+            except DatabaseError as exc:
+                if inserted:
+                    raise
+                report.fail([{"row": valid[0][0] + 2, "errors": {"database": f"Rows {valid[0][0] + 2}-{valid[-1][0] + 2} were not imported: {exc}"}}])
+                report.failed += len(questions) - 1
+        if on_chunk is not None:
+            on_chunk(report)
+    return report
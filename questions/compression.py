@@ -0,0 +1,100 @@
+"""
+Precompressed response bodies.
+
+``GZipMiddleware`` compresses every response again on every request. Bodies
+cached here are stored once per representation (identity, gzip and, when the
+``brotli`` package is installed, br) in the Django cache, so a hit is served
+with no serialization and no compression. Responses carry
+``Content-Encoding`` and ``Vary: Accept-Encoding``; ``GZipMiddleware`` leaves
+responses that already have a ``Content-Encoding`` alone.
+"""
+import gzip
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Bodies shorter than this are served as they are, like GZipMiddleware does.
+MIN_COMPRESS_LENGTH = 200
+# Bodies are compressed once per generation, so spend the CPU on ratio.
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+def _accepts(accept_encoding, coding):
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        if name.strip().lower() != coding:
+            continue
+        params = params.strip().replace(' ', '')
+        return not params.startswith('q=') or params[2:] not in ('0', '0.0', '0.00', '0.000')
+    return False
+
+
+def accepted_encoding(request):
+    """The best representation the client takes: ``'br'``, ``'gzip'`` or ``'identity'``."""
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    if brotli is not None and _accepts(accept_encoding, 'br'):
+        return 'br'
+    if _accepts(accept_encoding, 'gzip'):
+        return 'gzip'
+    return 'identity'
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+    return content
+
+
+def get(key, encoding, timeout):
+    """
+    ``(content, encoding)`` cached under ``key``. A missing compressed body
+    is made from the cached identity body; ``content`` is None when there is
+    no identity body either.
+    """
+    content = cache.get(f'{key}:{encoding}')
+    if isinstance(content, tuple):
+        # A body too short to compress, kept as it is (see _store_encoded).
+        return content
+    if content is not None:
+        return content, encoding
+    if encoding == 'identity':
+        return None, encoding
+    identity = cache.get(f'{key}:identity')
+    if identity is None:
+        return None, encoding
+    return _store_encoded(key, identity, encoding, timeout)
+
+
+def store(key, identity, encoding, timeout):
+    """Cache ``identity`` under ``key`` and return ``(content, encoding)`` for the client."""
+    cache.set(f'{key}:identity', identity, timeout)
+    if encoding == 'identity':
+        return identity, encoding
+    return _store_encoded(key, identity, encoding, timeout)
+
+
+def _store_encoded(key, identity, encoding, timeout):
+    if len(identity) < MIN_COMPRESS_LENGTH:
+        # Kept under the requested encoding too, so reading it is one hit.
+        cache.set(f'{key}:{encoding}', (identity, 'identity'), timeout)
+        return identity, 'identity'
+    content = compress(identity, encoding)
+    cache.set(f'{key}:{encoding}', content, timeout)
+    return content, encoding
+
+
+def encoded_response(content, content_type, encoding, status=200):
+    response = HttpResponse(content, content_type=content_type, status=status)
+    if encoding != 'identity':
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,48 @@
+"""
+Conditional GET for DRF list views.
+
+``ConditionalListMixin`` fingerprints a list before serializing anything.
+By default the fingerprint is the generation counters of ``cache_models``
+(see ``generations.py``), which every save, delete and ``bulk_create``
+moves; views can override ``get_list_fingerprint`` to return a finer one.
+Clients sending ``If-None-Match``/``If-Modified-Since`` for an unchanged list
+get a 304 without the queryset being evaluated.
+"""
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import generations
+
+
+def list_etag(version, format, full_path):
+    """The strong ETag of a list at ``version``, rendered as ``format``."""
+    return '"%s"' % hashlib.sha1(f'{version}:{format}:{full_path}'.encode()).hexdigest()
+
+
+class ConditionalListMixin:
+    cache_models = ()
+
+    def get_list_fingerprint(self):
+        """Return ``(version, last_modified)``; ``last_modified`` may be None."""
+        return generations.current(*self.cache_models), None
+
+    def get_list_etag(self, request, version):
+        return list_etag(version, request.accepted_renderer.format, request.get_full_path())
+
+    def list(self, request, *args, **kwargs):
+        version, last_modified = self.get_list_fingerprint()
+        etag = self.get_list_etag(request, version)
+        last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        # The same ETag covers every content coding, so it can only be weak
+        # on a compressed representation.
+        response['ETag'] = f'W/{etag}' if response.has_header('Content-Encoding') else etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
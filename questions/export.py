@@ -0,0 +1,33 @@
+"""
+NDJSON export of the question bank.
+
+One ``QuestionListValues`` row (optionally narrowed with ``?fields=`` /
+``?exclude=``) per line, read with
+``QuerySet.iterator(chunk_size=EXPORT_CHUNK_SIZE)``. On PostgreSQL that runs
+over a server-side cursor, so memory stays flat however many questions
+match. The cursor is opened inside a transaction; in autocommit mode Django
+would declare it ``WITH HOLD`` and PostgreSQL would materialise the whole
+result before the first row is sent.
+"""
+from django.db import transaction
+
+from .renderers import STREAM_CHUNK_SIZE, dumps
+from .values_serializers import QuestionListValues
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE, serializer=QuestionListValues):
+    """Yield the questions in ``queryset`` as NDJSON, in chunks of about ``STREAM_CHUNK_SIZE`` bytes."""
+    convert = serializer.row_converter()
+    with transaction.atomic(using=queryset.db):
+        lines, size = [], 0
+        for row in serializer.values(queryset).iterator(chunk_size=chunk_size):
+            line = dumps(convert(row)) + b'\n'
+            lines.append(line)
+            size += len(line)
+            if size >= STREAM_CHUNK_SIZE:
+                yield b''.join(lines)
+                lines, size = [], 0
+        if lines:
+            yield b''.join(lines)
@@ -0,0 +1,88 @@
+"""
+Per-model generation counters for cache invalidation.
+
+Every Group, Subject, Category, SubCategory and Question write (save, delete,
+``bulk_create``, admin edits) increments that model's counter in Redis, see
+``signals.py``. Cache keys include the counters of every model the cached
+value depends on, so a write makes the old entries unreachable at once and
+they can be kept with long TTLs.
+
+Questions only carry the names of their taxonomy nodes, so question payloads
+and lists follow ``TAXONOMY_NAMES`` instead, which moves only when a node is
+renamed or deleted.
+"""
+import hashlib
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from . import compression
+from .async_redis import get_async_redis
+from .models import Category, Group, SubCategory, Subject
+
+TAXONOMY_MODELS = (Group, Subject, Category, SubCategory)
+TAXONOMY_NAMES = 'taxonomy_names'
+
+
+def _key(model):
+    # Models, or the name of a counter that is not tied to one model.
+    if isinstance(model, str):
+        return f'generation:{model}'
+    return f'generation:{model._meta.label_lower}'
+
+
+def _join(values):
+    return '.'.join(str(int(value or 0)) for value in values)
+
+
+def current(*models):
+    """The models' counters as one string, e.g. ``'4.12.0'``, for use in cache keys."""
+    return _join(get_redis_connection('default').mget([_key(model) for model in models]))
+
+
+async def acurrent(*models):
+    return _join(await get_async_redis().mget([_key(model) for model in models]))
+
+
+def bump(*models):
+    pipe = get_redis_connection('default').pipeline()
+    for model in models:
+        pipe.incr(_key(model))
+    pipe.execute()
+
+
+def list_cache_key(name, version, url):
+    """Cache key of the list ``name`` at ``url`` under the generations ``version``."""
+    return f'view:{name}:{version}:{hashlib.sha1(url.encode()).hexdigest()}'
+
+
+class GenerationCachedListMixin:
+    """
+    Cache ``list()`` responses of a DRF list view under the current
+    generation of ``cache_models``. The key covers the full URL, so
+    pagination, filters, search and ordering are cached separately.
+
+    JSON bodies are cached rendered and precompressed (see ``compression.py``):
+    a hit costs one cache read. Other formats (the browsable API) are
+    rendered per request and not cached.
+    """
+    cache_models = ()
+
+    def get_list_cache_key(self, request):
+        return list_cache_key(type(self).__name__, current(*self.cache_models), request.build_absolute_uri())
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+
+        key = self.get_list_cache_key(request)
+        content, encoding = compression.get(key, compression.accepted_encoding(request), settings.VIEW_CACHE_TTL)
+        if content is None:
+            response = super().list(request, *args, **kwargs)
+            if response.streaming:
+                # Streamed pages are too big to be worth holding in the cache.
+                return response
+            identity = renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+            content, encoding = compression.store(key, identity, encoding, settings.VIEW_CACHE_TTL)
+        return compression.encoded_response(content, renderer.media_type, encoding)
@@ -0,0 +1,152 @@
+"""
+Background question imports.
+
+A large upload imported inside the request outlives the gunicorn timeout and
+holds one of the three workers while it runs. ``enqueue()`` only copies the
+NDJSON/CSV body to ``IMPORT_JOB_ROOT`` and records a pending ``ImportJob``;
+``manage.py run_import_jobs`` worker processes take jobs from that table with
+``SELECT ... FOR UPDATE SKIP LOCKED`` and import them through
+``bulk_import.import_stream``. The database is the queue, so there is no
+broker to run, and any number of workers can share it.
+
+A job's progress is saved in the transaction that inserts each chunk. When a
+worker dies, its job stops sending heartbeats. After
+``IMPORT_JOB_STALE_AFTER`` seconds another worker claims it again and
+continues after the last committed chunk, so no row is imported twice. A job
+is marked failed after ``IMPORT_JOB_MAX_ATTEMPTS`` claims. Its upload is
+deleted once the job succeeds or fails.
+"""
+import logging
+import uuid
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import bulk_import
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+PARSERS = {'ndjson': bulk_import.iter_ndjson, 'csv': bulk_import.iter_csv}
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class JobReclaimed(Exception):
+    """The job was claimed by another worker after this one stopped sending heartbeats."""
+
+
+def job_root():
+    return Path(settings.IMPORT_JOB_ROOT)
+
+
+def job_path(job):
+    return job_root() / job.file_name
+
+
+def enqueue(stream, format, user=None):
+    """
+    Copy the upload in ``stream`` to disk and return its pending job, or None
+    when the upload has no rows.
+    """
+    root = job_root()
+    root.mkdir(parents=True, exist_ok=True)
+    file_name = f'{uuid.uuid4().hex}.{format}'
+    lines, last = 0, b'\n'
+    try:
+        with open(root / file_name, 'wb') as upload:
+            while chunk := stream.read(COPY_CHUNK_SIZE):
+                upload.write(chunk)
+                lines += chunk.count(b'\n')
+                last = chunk[-1:]
+        lines += last != b'\n'
+        if format == 'csv':
+            lines -= 1  # header
+        if lines <= 0:
+            (root / file_name).unlink()
+            return None
+        return ImportJob.objects.create(format=format, file_name=file_name, total_rows=lines, created_by=user)
+    except BaseException:
+        (root / file_name).unlink(missing_ok=True)
+        raise
+
+
+def claim():
+    """Mark the oldest job ready to run as running and return it, or None."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.IMPORT_JOB_STALE_AFTER)
+    with transaction.atomic():
+        job = (
+            ImportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', heartbeat_at__lt=stale))
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.attempts += 1
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'attempts', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def _claimed(job):
+    # Matching on attempts stops a worker whose job was claimed again.
+    return ImportJob.objects.filter(pk=job.pk, attempts=job.attempts)
+
+
+def _finish(job, status, message=''):
+    now = timezone.now()
+    fields = {'status': status, 'message': message, 'finished_at': now, 'heartbeat_at': now}
+    if status == 'succeeded':
+        fields['total_rows'] = F('processed_rows')
+    # A job claimed again meanwhile still needs its upload.
+    if _claimed(job).update(**fields):
+        job_path(job).unlink(missing_ok=True)
+    job.refresh_from_db()
+
+
+def run(job):
+    """Import a claimed job from its last committed chunk to the end."""
+    if job.attempts > settings.IMPORT_JOB_MAX_ATTEMPTS:
+        _finish(job, 'failed', f"Gave up after {job.attempts - 1} attempts.")
+        return job
+
+    report = bulk_import.ImportReport()
+    report.total, report.created, report.failed = job.processed_rows, job.created_rows, job.failed_rows
+    report.errors = list(job.errors)
+
+    def save_progress(report):
+        saved = _claimed(job).update(
+            processed_rows=report.total, created_rows=report.created, failed_rows=report.failed,
+            errors=report.errors, heartbeat_at=timezone.now(),
+        )
+        if not saved:
+            raise JobReclaimed(job.pk)
+
+    try:
+        with open(job_path(job), 'rb') as upload:
+            rows = islice(PARSERS[job.format](upload), job.processed_rows, None)
+            bulk_import.import_stream(rows, report=report, on_chunk=save_progress)
+    except JobReclaimed:
+        logger.warning("Import job %s was claimed by another worker.", job.pk)
+        return job
+    except Exception as exc:
+        logger.exception("Import job %s failed.", job.pk)
+        _finish(job, 'failed', str(exc))
+        return job
+
+    _finish(job, 'succeeded')
+    return job
+
+
+def run_next():
+    """Claim and run one job; None when the queue is empty."""
+    job = claim()
+    return run(job) if job is not None else None
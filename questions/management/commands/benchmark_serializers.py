@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.models import Category, Question, SubCategory
+from questions.serializers import CategoryReadSerializer, QuestionDetailSerializer, QuestionListSerializer, SubCategoryReadSerializer
+from questions.values_serializers import CategoryReadValues, QuestionDetailValues, QuestionListValues, SubCategoryReadValues
+
+BENCHMARKS = {
+    'question-list': (QuestionListSerializer, QuestionListValues, lambda: Question.objects.order_by('-created_at', '-id')),
+    'question-detail': (QuestionDetailSerializer, QuestionDetailValues, lambda: Question.objects.order_by('-created_at', '-id')),
+    'category': (CategoryReadSerializer, CategoryReadValues, lambda: Category.objects.select_related('subject', 'group').prefetch_related('subcategories').order_by('name', 'id')),
+    'subcategory': (SubCategoryReadSerializer, SubCategoryReadValues, lambda: SubCategory.objects.select_related('category', 'subject', 'group').order_by('name', 'id')),
+}
+
+
+class Command(BaseCommand):
+    help = "Compare the per-row cost of the DRF serializers and the values() serializers on one page of real rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help="Rows per page (default 100).")
+        parser.add_argument('--repeat', type=int, default=50, help="Timed runs per path (default 50).")
+        parser.add_argument('--only', choices=sorted(BENCHMARKS), help="Run a single benchmark.")
+
+    def handle(self, *args, rows, repeat, only, **options):
+        names = [only] if only else list(BENCHMARKS)
+        self.stdout.write(f"{'benchmark':<16}{'rows':>6}{'drf us/row':>12}{'values us/row':>15}{'speedup':>9}   (fetch + serialize, best of {repeat})")
+        for name in names:
+            serializer, values_serializer, queryset = BENCHMARKS[name]
+            count = len(queryset()[:rows])
+            if not count:
+                raise CommandError(f"No rows to serialize for {name}.")
+
+            drf = self.best(repeat, lambda: serializer(list(queryset()[:rows]), many=True).data)
+            values = self.best(repeat, lambda: values_serializer.serialize(list(values_serializer.values(queryset())[:rows])))
+            drf_per_row, values_per_row = drf / count * 1e6, values / count * 1e6
+            self.stdout.write(f"{name:<16}{count:>6}{drf_per_row:>12.1f}{values_per_row:>15.1f}{drf / values:>8.1f}x")
+
+    def best(self, repeat, run):
+        run()  # warm up connections and caches
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.export import EXPORT_CHUNK_SIZE, ndjson
+from questions.metadata import metadata_q
+from questions.models import Question
+from questions.search import search_query
+from questions.views import Question_Dashboard
+
+
+class Command(BaseCommand):
+    help = "Stream every question matching the dashboard filters to a file (or stdout) as NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="File to write; defaults to stdout.")
+        parser.add_argument(
+            '--filter', action='append', default=[], metavar='FIELD=VALUE',
+            help=f"Dashboard filter, repeatable. Fields: {', '.join(Question_Dashboard.filterset_fields)}.",
+        )
+        parser.add_argument('--search', help="Full-text search, as ?search= on the dashboard.")
+        parser.add_argument('--metadata', help="JSON object the metadata must contain.")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched per round trip.")
+
+    def handle(self, *args, output, filter, search, metadata, chunk_size, **options):
+        queryset = Question.objects.order_by('id')
+        for item in filter:
+            field, _, value = item.partition('=')
+            if field not in Question_Dashboard.filterset_fields or not value:
+                raise CommandError(f"Invalid filter {item!r}.")
+            queryset = queryset.filter(**{field: value})
+        if search:
+            query = search_query(search)
+            if query is not None:
+                queryset = queryset.filter(search_document=query)
+        if metadata:
+            try:
+                queryset = queryset.filter(metadata_q({'metadata': json.loads(metadata)}))
+            except ValueError:
+                raise CommandError("--metadata must be a JSON object.")
+
+        written = 0
+        if output:
+            with open(output, 'wb') as stream:
+                for chunk in ndjson(queryset, chunk_size=chunk_size):
+                    stream.write(chunk)
+                    written += chunk.count(b'\n')
+        else:
+            for chunk in ndjson(queryset, chunk_size=chunk_size):
+                self.stdout.write(chunk.decode(), ending='')
+                written += chunk.count(b'\n')
+        self.stderr.write(self.style.SUCCESS(f"Exported {written} questions."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from questions.quiz_packs import prune
+
+
+class Command(BaseCommand):
+    help = "Delete quiz pack files that have not been served for a while."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Remove packs idle for this many days (default 7).")
+
+    def handle(self, *args, **options):
+        removed = prune(options['days'] * 60 * 60 * 24)
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} quiz packs."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from questions.models import QuestionCount
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-taxonomy question counts from the questions table."
+
+    def handle(self, *args, **options):
+        QuestionCount.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {QuestionCount.objects.count()} question count rows."))
@@ -0,0 +1,34 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from questions import import_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued question imports (POST /api/upload-questions/jobs/). Any number of workers can run side by side."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit when the queue is empty instead of polling.")
+        parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds to wait between polls of an empty queue (default 2).")
+
+    def handle(self, *args, once, poll_interval, **options):
+        stopping = []
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stopping.append(True))
+
+        while not stopping:
+            job = import_jobs.run_next()
+            if job is not None:
+                self.stdout.write(
+                    f"Import job {job.pk} {job.status}: {job.created_rows} created, "
+                    f"{job.failed_rows} failed of {job.processed_rows} rows."
+                )
+                continue
+            if once:
+                break
+            # Drop a connection that broke or outlived CONN_MAX_AGE while idle.
+            close_old_connections()
+            time.sleep(poll_interval)
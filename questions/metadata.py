@@ -0,0 +1,122 @@
+"""
+Filters on ``Question.metadata``.
+
+Three predicates, all answered by the ``jsonb_path_ops`` GIN index on
+``metadata`` (``q_metadata_gin_idx``):
+
+* ``metadata``: a JSON object the metadata must contain (``@>``),
+* ``metadata_has_keys``: top-level keys that must be present, tested as
+  ``@? '$."key"'`` because ``jsonb_path_ops`` does not serve ``?``,
+* ``metadata_path``: a SQL/JSON path predicate such as
+  ``$.points > 3`` (``@@``).
+
+The same dict keys are accepted in quiz filters (``QuestionViewSet``) and as
+query parameters on the question dashboard.
+"""
+import json
+
+from django.db import DataError, ProgrammingError, connection, transaction
+from django.db.models import JSONField, Lookup, Q
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+METADATA_FILTER_KEYS = ('metadata', 'metadata_has_keys', 'metadata_path')
+
+
+class JSONPathLookup(Lookup):
+    prepare_rhs = False
+    operator = None
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} {self.operator} {rhs}::jsonpath', (*lhs_params, *rhs_params)
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [value]
+
+
+@JSONField.register_lookup
+class JSONPathExists(JSONPathLookup):
+    lookup_name = 'path_exists'
+    operator = '@?'
+
+
+@JSONField.register_lookup
+class JSONPathMatch(JSONPathLookup):
+    lookup_name = 'path_match'
+    operator = '@@'
+
+
+def key_path(key):
+    return '$."%s"' % key.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def has_metadata_filters(filters):
+    return any(filters.get(key) for key in METADATA_FILTER_KEYS)
+
+
+def metadata_q(filters):
+    """The ``Q`` for the metadata predicates in ``filters`` (empty when there are none)."""
+    q = Q()
+    if filters.get('metadata'):
+        q &= Q(metadata__contains=filters['metadata'])
+    for key in filters.get('metadata_has_keys') or []:
+        q &= Q(metadata__path_exists=key_path(key))
+    if filters.get('metadata_path'):
+        q &= Q(metadata__path_match=filters['metadata_path'])
+    return q
+
+
+def clean_metadata_filters(data):
+    """
+    Validate the metadata predicates in ``data`` and return only those that
+    were given, so filters without them hash exactly as before.
+    """
+    cleaned = {}
+    contains = data.get('metadata')
+    if contains:
+        if not isinstance(contains, dict):
+            raise ValidationError({'metadata': "Expected a JSON object."})
+        cleaned['metadata'] = contains
+
+    keys = data.get('metadata_has_keys')
+    if keys:
+        if not isinstance(keys, list) or not all(isinstance(key, str) and key for key in keys):
+            raise ValidationError({'metadata_has_keys': "Expected a list of keys."})
+        cleaned['metadata_has_keys'] = keys
+
+    path = data.get('metadata_path')
+    if path:
+        if not isinstance(path, str):
+            raise ValidationError({'metadata_path': "Expected a JSON path predicate."})
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SELECT %s::jsonpath', [path])
+        except (DataError, ProgrammingError):
+            raise ValidationError({'metadata_path': "Invalid JSON path predicate."})
+        cleaned['metadata_path'] = path
+    return cleaned
+
+
+class MetadataFilter(filters.BaseFilterBackend):
+    """``?metadata={...}``, ``?metadata_has_keys=a,b`` and ``?metadata_path=...``."""
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        data = {}
+        if params.get('metadata'):
+            try:
+                data['metadata'] = json.loads(params['metadata'])
+            except ValueError:
+                raise ValidationError({'metadata': "Expected a JSON object."})
+        keys = [key for value in params.getlist('metadata_has_keys') for key in value.split(',') if key]
+        if keys:
+            data['metadata_has_keys'] = keys
+        if params.get('metadata_path'):
+            data['metadata_path'] = params['metadata_path']
+
+        predicates = clean_metadata_filters(data)
+        if not predicates:
+            return queryset
+        return queryset.filter(metadata_q(predicates))
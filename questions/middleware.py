@@ -3,9 +3,8 @@ from django.contrib.sessions.middleware import SessionMiddleware
 
 class CustomSessionMiddleware(SessionMiddleware):
     def process_request(self, request):
-        session_key = request.headers.get('X-Session-Id')
-
-        if session_key:
-            request.session = self.SessionStore(session_key)
-        else:
-            super().process_request(request)
\ No newline at end of file
+        # X-Session-Id names a quiz run in the Redis quiz state store; it is
+        # kept away from the database session so quiz requests never load or
+        # save a django_session row.
+        request.quiz_session_id = request.headers.get('X-Session-Id')
+        super().process_request(request)
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counts(apps, schema_editor):
+    Question = apps.get_model('questions', 'Question')
+    QuestionCount = apps.get_model('questions', 'QuestionCount')
+    rows = Question.objects.order_by().values('group_id', 'subject_id', 'category_id', 'subcategory_id', 'level').annotate(total=Count('id'))
+    QuestionCount.objects.bulk_create([QuestionCount(count=row.pop('total'), **row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0012_alter_question_options_question_q_group_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('advance', 'Advance')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.category')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.group')),
+                ('subcategory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.subcategory')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.subject')),
+            ],
+            options={
+                'verbose_name': 'Question count',
+                'verbose_name_plural': 'Question counts',
+                'indexes': [models.Index(fields=['group', 'subject'], name='qcount_gs_idx')],
+                'constraints': [models.UniqueConstraint(fields=('group', 'subject', 'category', 'subcategory', 'level'), name='question_count_node_uniq', nulls_distinct=False)],
+            },
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
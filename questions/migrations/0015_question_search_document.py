@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:54
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Same document as questions.search.DOCUMENT_SQL at the time of writing.
+POPULATE_SQL = """
+UPDATE questions_question q SET search_document =
+    setweight(jsonb_to_tsvector('simple', q.metadata, '["string", "numeric"]'), 'A') ||
+    setweight(to_tsvector('simple', concat_ws(' ',
+        (SELECT name FROM questions_group WHERE id = q.group_id),
+        (SELECT name FROM questions_subject WHERE id = q.subject_id),
+        (SELECT name FROM questions_category WHERE id = q.category_id),
+        (SELECT name FROM questions_subcategory WHERE id = q.subcategory_id)
+    )), 'B') ||
+    setweight(to_tsvector('simple', concat_ws(' ', q.type, q.level, q.id)), 'C')
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0014_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='search_document',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='q_search_gin_idx'),
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
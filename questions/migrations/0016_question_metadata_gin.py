@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:56
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0015_question_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['metadata'], name='q_metadata_gin_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:58
+
+from django.db import migrations, models
+
+POPULATE_SQL = """
+UPDATE questions_question q SET
+    group_name = g.name,
+    subject_name = s.name,
+    category_name = c.name,
+    subcategory_name = sc.name
+FROM questions_group g, questions_subject s, questions_category c, questions_question q2
+LEFT JOIN questions_subcategory sc ON sc.id = q2.subcategory_id
+WHERE q2.id = q.id AND g.id = q.group_id AND s.id = q.subject_id AND c.id = q.category_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0016_question_metadata_gin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='category_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='group_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='subcategory_name',
+            field=models.CharField(editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='subject_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
@@ -1,57 +1,147 @@
-from django.db import models
-from django.db.models import F
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F
+from django.dispatch import Signal
 
-class Group(models.Model):
+# Sent after bulk_create() on questions and on the taxonomy models, which
+# skips post_save.
+questions_bulk_created = Signal()
+taxonomy_bulk_created = Signal()
+
+
+class TaxonomyQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        taxonomy_bulk_created.send(sender=self.model, instances=created)
+        return created
+
+
+class TaxonomyNode:
+    """
+    Remembers the loaded ``name``, so a save can tell whether the node was
+    renamed without reading the row again.
+    """
+    _loaded_name = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'name' in field_names:
+            instance._loaded_name = instance.name
+        return instance
+
+    def is_renamed(self):
+        if self._loaded_name is None:
+            # Built by hand or loaded without its name: ask the database.
+            return self.pk is not None and type(self)._base_manager.filter(pk=self.pk).exclude(name=self.name).exists()
+        return self.name != self._loaded_name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_name = self.name
+
+
+class Group(TaxonomyNode, models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TaxonomyQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
-class Subject(models.Model):
+class Subject(TaxonomyNode, models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='subjects')
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TaxonomyQuerySet.as_manager()
     
     class Meta:
         unique_together = ('name','group')
         ordering = ['group', 'name']
+        indexes = [models.Index(fields=['name', 'id'], name='subject_name_id_idx')]
         verbose_name = 'Subject'
         verbose_name_plural = 'Subjects'
 
     def __str__(self):
         return self.name
 
-class Category(models.Model):
+class Category(TaxonomyNode, models.Model):
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='categories')
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='categories')
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TaxonomyQuerySet.as_manager()
     class Meta:
         unique_together = ( 'name', 'subject','group')
         ordering = ['subject', 'name']
+        indexes = [models.Index(fields=['name', 'id'], name='category_name_id_idx')]
         verbose_name = 'Category'
         verbose_name_plural = 'Categories'
     def __str__(self):
         return self.name
 
-class SubCategory(models.Model):
+class SubCategory(TaxonomyNode, models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='subcategories')
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='subcategories')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='subcategories')
     name = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = TaxonomyQuerySet.as_manager()
+
     class Meta:
         unique_together = ('name', 'category','subject','group')
         ordering = [ 'name', 'category','subject', 'group']
+        indexes = [models.Index(fields=['name', 'id'], name='subcategory_name_id_idx')]
         verbose_name = 'SubCategory'
         verbose_name_plural = 'SubCategories'
     def __str__(self):
         return self.name
 
+# Relations whose names are copied onto each question (``<relation>_name``).
+TAXONOMY_RELATIONS = ('group', 'subject', 'category', 'subcategory')
+
+
+def fill_taxonomy_names(questions):
+    """
+    Copy the taxonomy names onto ``questions``. Relations already loaded on
+    the instance cost nothing, the rest are fetched with one query per
+    relation however many questions there are.
+    """
+    for relation in TAXONOMY_RELATIONS:
+        field = Question._meta.get_field(relation)
+        pending = {}
+        for question in questions:
+            if field.is_cached(question):
+                related = field.get_cached_value(question)
+                setattr(question, f'{relation}_name', related.name if related else None)
+            elif getattr(question, field.attname) is None:
+                setattr(question, f'{relation}_name', None)
+            elif getattr(question, field.attname) != question._loaded_taxonomy.get(relation):
+                pending.setdefault(getattr(question, field.attname), []).append(question)
+        if pending:
+            names = dict(field.related_model.objects.filter(pk__in=pending).values_list('pk', 'name'))
+            for pk, waiting in pending.items():
+                for question in waiting:
+                    setattr(question, f'{relation}_name', names.get(pk))
+
+
+class QuestionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        fill_taxonomy_names(objs)
+        created = super().bulk_create(objs, *args, **kwargs)
+        questions_bulk_created.send(sender=self.model, instances=created)
+        return created
+
+
 class Question(models.Model):
     LEVEL_CHOICES = [
         ("easy", "Easy"),
@@ -81,6 +171,18 @@ class Question(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Read model: the taxonomy names, so question reads need no joins. Set by
+    # save() and bulk_create(), and rewritten in place when a node is renamed.
+    group_name = models.CharField(max_length=100, editable=False, default='')
+    subject_name = models.CharField(max_length=100, editable=False, default='')
+    category_name = models.CharField(max_length=100, editable=False, default='')
+    subcategory_name = models.CharField(max_length=100, editable=False, null=True)
+
+    # Maintained by questions.search.refresh_search_documents.
+    search_document = SearchVectorField(null=True, editable=False)
+
+    objects = QuestionQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Question'
@@ -97,7 +199,7 @@ class Question(models.Model):
 
             # common query patterns
             models.Index(fields=['level', 'type'], name='q_level_type_idx'),
-            models.Index(fields=['created_at'], name='q_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='q_created_id_idx'),  # keyset pagination
 
             # Composite indexes for complex queries
 
@@ -108,9 +210,150 @@ class Question(models.Model):
 
             models.Index(fields=['level'], name='q_level_idx'),
             models.Index(fields=['type'], name='q_type_idx'),
+
+            GinIndex(fields=['search_document'], name='q_search_gin_idx'),
+            GinIndex(fields=['metadata'], opclasses=['jsonb_path_ops'], name='q_metadata_gin_idx'),
         ]
 
     def __str__(self):
         return f"Question {self.id} - {self.type} - {self.level}"
-    
 
+    # Loaded values later saves and deletes compare against: the count key,
+    # and the relation ids whose names are already in the ``*_name`` columns.
+    TRACKED_FIELDS = ('group_id', 'subject_id', 'category_id', 'subcategory_id', 'level')
+    _loaded_taxonomy = {}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Reading a deferred field here would load it through another
+        # from_db, and so on; partial loads read the stored row on save().
+        if set(cls.TRACKED_FIELDS).issubset(field_names):
+            instance._remember_loaded()
+        return instance
+
+    def _remember_loaded(self):
+        self._count_key = self.count_key()
+        self._loaded_taxonomy = {relation: getattr(self, f'{relation}_id') for relation in TAXONOMY_RELATIONS}
+
+    def _remember_stored(self):
+        if self._state.adding or '_count_key' in self.__dict__:
+            return
+        stored = type(self)._base_manager.filter(pk=self.pk).values_list(*self.TRACKED_FIELDS).first()
+        if stored is not None:
+            self._count_key = stored
+            self._loaded_taxonomy = dict(zip(TAXONOMY_RELATIONS, stored))
+
+    def save(self, *args, **kwargs):
+        self._remember_stored()
+        fill_taxonomy_names([self])
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *(
+                f'{relation}_name' for relation in TAXONOMY_RELATIONS
+                if relation in update_fields or f'{relation}_id' in update_fields
+            )}
+        super().save(*args, **kwargs)
+        self._loaded_taxonomy = {relation: getattr(self, f'{relation}_id') for relation in TAXONOMY_RELATIONS}
+
+    def delete(self, *args, **kwargs):
+        self._remember_stored()
+        return super().delete(*args, **kwargs)
+
+    def count_key(self):
+        return (self.group_id, self.subject_id, self.category_id, self.subcategory_id, self.level)
+
+
+class QuestionCountQuerySet(models.QuerySet):
+    def apply_deltas(self, deltas):
+        """Add ``{(group_id, subject_id, category_id, subcategory_id, level): delta}`` to the counts."""
+        for (group_id, subject_id, category_id, subcategory_id, level), delta in deltas.items():
+            if not delta:
+                continue
+            lookup = dict(group_id=group_id, subject_id=subject_id, category_id=category_id, subcategory_id=subcategory_id, level=level)
+            if self.filter(**lookup).update(count=F('count') + delta) or delta < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    self.create(count=delta, **lookup)
+            except IntegrityError:
+                self.filter(**lookup).update(count=F('count') + delta)
+
+    def rebuild(self):
+        rows = Question.objects.order_by().values('group_id', 'subject_id', 'category_id', 'subcategory_id', 'level').annotate(total=Count('id'))
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create([QuestionCount(count=row.pop('total'), **row) for row in rows], batch_size=1000)
+
+
+class QuestionCount(models.Model):
+    """Number of questions per taxonomy node and level, maintained incrementally."""
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='+')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    subcategory = models.ForeignKey(SubCategory, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    level = models.CharField(max_length=20, choices=Question.LEVEL_CHOICES)
+    count = models.IntegerField(default=0)
+
+    objects = QuestionCountQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Question count'
+        verbose_name_plural = 'Question counts'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'subject', 'category', 'subcategory', 'level'],
+                name='question_count_node_uniq',
+                nulls_distinct=False,
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['group', 'subject'], name='qcount_gs_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.count} {self.level} questions"
+
+
+class ImportJob(models.Model):
+    """A stored NDJSON/CSV upload imported by ``manage.py run_import_jobs`` (see ``import_jobs.py``)."""
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+    FORMAT_CHOICES = [
+        ("ndjson", "NDJSON"),
+        ("csv", "CSV"),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    format = models.CharField(max_length=20, choices=FORMAT_CHOICES)
+    file_name = models.CharField(max_length=100, editable=False)  # under IMPORT_JOB_ROOT
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    # Progress, committed with each chunk's questions.
+    total_rows = models.IntegerField(default=0)  # lines in the upload until the job finishes
+    processed_rows = models.IntegerField(default=0)
+    created_rows = models.IntegerField(default=0)
+    failed_rows = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Import job'
+        verbose_name_plural = 'Import jobs'
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(status__in=['pending', 'running']), name='importjob_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"Import job {self.id} - {self.status}"
@@ -0,0 +1,249 @@
+"""
+Pagination classes shared by the list views.
+
+``KeysetPagination`` pages on a unique ordering such as ``(created_at, id)``:
+the cursor carries the ordering values of the row at the page edge and the
+next page is read from the index starting right after that row, with
+``ORDER BY ... LIMIT n`` and no OFFSET or COUNT. With a matching composite
+index page 5000 costs the same as page 1. Cursors work in both directions.
+
+``CursorOrPageNumberPagination`` keeps page-number pagination as the default
+and switches to keyset pagination when the request carries ``?cursor=``
+(empty for the first page). Views choose the keyset order with
+``keyset_ordering``.
+
+``EstimatedCountPaginator`` replaces the exact ``COUNT(*)`` with PostgreSQL's
+own estimate once a query is known to match more than
+``ESTIMATED_COUNT_THRESHOLD`` rows: ``pg_class.reltuples`` for unfiltered
+tables (kept current by autovacuum/ANALYZE) and the planner's row estimate
+for filtered queries. Smaller results are still counted exactly.
+"""
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class EstimatedCountPaginator(Paginator):
+    count_is_estimated = False
+
+    @property
+    def threshold(self):
+        return settings.ESTIMATED_COUNT_THRESHOLD
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        estimate = self.estimate(queryset) if hasattr(queryset, 'query') else None
+        if estimate is None or estimate < self.threshold:
+            return super().count
+        self.count_is_estimated = True
+        return estimate
+
+    def estimate(self, queryset):
+        """PostgreSQL's row estimate for ``queryset``, or None when there is none to trust."""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.distinct or queryset.query.is_sliced:
+            return None
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [connection.ops.quote_name(queryset.model._meta.db_table)])
+                row = cursor.fetchone()
+            # reltuples is -1 until the table is first vacuumed or analyzed.
+            return row[0] if row and row[0] >= 0 else None
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def validate_number(self, number):
+        # An estimated total can be low; pages past it are read (see page()).
+        self.count  # decides count_is_estimated
+        if not self.count_is_estimated:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        return number if number >= 1 else super().validate_number(number)
+
+    def page(self, number):
+        """
+        With an estimated count, read one row past the page instead of
+        clamping to the estimate: that row decides ``has_next()``, so rows
+        beyond a low estimate stay reachable.
+        """
+        number = self.validate_number(number)
+        if not self.count_is_estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return EstimatedPage(rows[:self.per_page], number, self, has_more=len(rows) > self.per_page)
+
+
+class EstimatedPage(Page):
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size = StandardResultsSetPagination.page_size
+    page_size_query_param = StandardResultsSetPagination.page_size_query_param
+    max_page_size = StandardResultsSetPagination.max_page_size
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, view):
+        ordering = getattr(view, 'keyset_ordering', None) or self.ordering
+        return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = self.get_ordering(view)
+        position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        # Walking backwards is walking forwards over the flipped ordering.
+        fields = [(name, descending != self.reverse) for name, descending in self.fields]
+        queryset = queryset.order_by(*[('-' if descending else '') + name for name, descending in fields])
+        if position is not None:
+            queryset = queryset.filter(self._after(fields, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.page = results
+        if self.reverse:
+            self.has_next = bool(results)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None and bool(results)
+        return results
+
+    def _after(self, fields, position):
+        """Rows strictly after ``position`` in the given ordering."""
+        clauses = []
+        equal = {}
+        for (name, descending), value in zip(fields, position):
+            clauses.append(Q(**equal, **{f'{name}__{"lt" if descending else "gt"}': value}))
+            equal[name] = value
+        # The bound on the leading column lets the index range scan start at
+        # the cursor instead of filtering from the top.
+        name, descending = fields[0]
+        return Q(**{f'{name}__{"lte" if descending else "gte"}': position[0]}) & reduce(or_, clauses)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = data['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [model._meta.get_field(name).to_python(value) for (name, _), value in zip(self.fields, values)]
+            return position, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        values = [getattr(obj, name) for name, _ in self.fields]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        encoded = base64.urlsafe_b64encode(json.dumps({'p': values, 'r': int(reverse)}).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CursorOrPageNumberPagination(StandardResultsSetPagination):
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class EstimatedCountPagination(CursorOrPageNumberPagination):
+    """Page numbers with an estimated ``count`` on big results (see ``EstimatedCountPaginator``)."""
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.keyset is None:
+            response.data['count_estimated'] = self.page.paginator.count_is_estimated
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count_estimated'] = {'type': 'boolean'}
+        return response_schema
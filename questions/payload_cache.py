@@ -0,0 +1,152 @@
+"""
+Read-through cache of rendered question JSON.
+
+Each question is rendered once with ``QuestionDetailValues`` (the output of
+``QuestionDetailSerializer``, built from ``values_list()``) and kept as
+JSON bytes in a small per-worker LRU and in Redis, keyed on the question id,
+its ``updated_at`` (read from the in-process question index, so a hit costs
+no database query) and the taxonomy names generation (see
+``generations.py``), which moves whenever a group, subject, category or
+subcategory is renamed or deleted. Responses are assembled from the
+cached fragments.
+
+A question edited on another worker is picked up once this worker's question
+index refreshes (``QUESTION_INDEX_REFRESH_SECONDS``).
+"""
+import threading
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django_redis import get_redis_connection
+
+from . import generations
+from .async_redis import get_async_redis
+from .models import Question
+from .question_index import question_index, to_micros
+from .renderers import FastJSONRenderer
+from .values_serializers import QuestionDetailValues
+
+PAYLOAD_TTL = 60 * 60 * 24
+# Primary keys are bigints, and the question index holds them in int64 arrays.
+MAX_QUESTION_ID = 2 ** 63 - 1
+
+
+def parse_question_id(value):
+    """``value`` as a question id, or None unless it is an integer from 1 to ``MAX_QUESTION_ID``."""
+    try:
+        question_id = int(value)
+    except (TypeError, ValueError):
+        return None
+    return question_id if 1 <= question_id <= MAX_QUESTION_ID else None
+
+
+class PayloadCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+        self._renderer = FastJSONRenderer()
+
+    @property
+    def max_local_entries(self):
+        return getattr(settings, 'QUESTION_PAYLOAD_LRU_SIZE', 4096)
+
+    def _redis(self):
+        return get_redis_connection('default')
+
+    def taxonomy_version(self):
+        return generations.current(generations.TAXONOMY_NAMES)
+
+    def _key(self, version, question_id, updated_at):
+        return f'question:payload:{version}:{question_id}:{updated_at}'
+
+    def _lookup_local(self, question_ids, version, versions):
+        """Split ``question_ids`` into local hits and the Redis keys still to fetch."""
+        payloads = {}
+        remote_keys = {}
+        with self._lock:
+            for question_id in question_ids:
+                entry = self._local.get(question_id)
+                if entry and entry[0] == (version, versions.get(question_id)):
+                    self._local.move_to_end(question_id)
+                    payloads[question_id] = entry[1]
+                elif question_id in versions:
+                    remote_keys[self._key(version, question_id, versions[question_id])] = question_id
+        return payloads, remote_keys
+
+    def _collect_remote(self, payloads, remote_keys, values, version, versions):
+        for key, payload in zip(remote_keys, values):
+            if payload is not None:
+                question_id = remote_keys[key]
+                payloads[question_id] = payload
+                self._remember(question_id, (version, versions[question_id]), payload)
+
+    def get_many(self, question_ids):
+        """Map each existing id in ``question_ids`` to its rendered JSON bytes."""
+        version = self.taxonomy_version()
+        versions = question_index.updated_at_for(question_ids)
+        payloads, remote_keys = self._lookup_local(question_ids, version, versions)
+
+        if remote_keys:
+            values = self._redis().mget(list(remote_keys))
+            self._collect_remote(payloads, remote_keys, values, version, versions)
+
+        missing = [question_id for question_id in question_ids if question_id not in payloads]
+        if missing:
+            payloads.update(self._render(missing, version))
+        return payloads
+
+    async def aget_many(self, question_ids):
+        """``get_many`` for async views: Redis through the asyncio client, rendering in a thread."""
+        redis = get_async_redis()
+        version = await generations.acurrent(generations.TAXONOMY_NAMES)
+        await question_index.arefresh()
+        versions = question_index.updated_at_for(question_ids, refresh=False)
+        payloads, remote_keys = self._lookup_local(question_ids, version, versions)
+
+        if remote_keys:
+            values = await redis.mget(list(remote_keys))
+            self._collect_remote(payloads, remote_keys, values, version, versions)
+
+        missing = [question_id for question_id in question_ids if question_id not in payloads]
+        if missing:
+            payloads.update(await sync_to_async(self._render)(missing, version))
+        return payloads
+
+    def _render(self, question_ids, version):
+        rows = QuestionDetailValues.values(Question.objects.filter(id__in=question_ids))
+        to_data = QuestionDetailValues.row_converter()
+        rendered = {}
+        pipe = self._redis().pipeline()
+        for row in rows:
+            payload = self._renderer.render(to_data(row))
+            updated_at = to_micros(row.updated_at)
+            rendered[row.id] = payload
+            pipe.set(self._key(version, row.id, updated_at), payload, ex=PAYLOAD_TTL)
+            self._remember(row.id, (version, updated_at), payload)
+        if rendered:
+            pipe.execute()
+        return rendered
+
+    def _remember(self, question_id, stamp, payload):
+        with self._lock:
+            self._local[question_id] = (stamp, payload)
+            self._local.move_to_end(question_id)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def forget(self, question_id):
+        with self._lock:
+            self._local.pop(question_id, None)
+
+
+def json_response(content, status=200):
+    return HttpResponse(content, content_type='application/json', status=status)
+
+
+def json_list(payloads):
+    return b'[' + b','.join(payloads) + b']'
+
+
+payload_cache = PayloadCache()
@@ -0,0 +1,44 @@
+"""
+Seeded pseudo-random permutations of ``range(size)``.
+
+A balanced Feistel network over the smallest even-width power of two that
+covers ``size``, with cycle walking to stay inside the range. Any position
+maps to its element in O(1) time and memory, so a quiz cursor only needs to
+remember a seed and a position instead of a shuffled list of ids.
+"""
+MASK64 = (1 << 64) - 1
+ROUNDS = 4
+
+
+def _mix(value):
+    # splitmix64 finalizer
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+class FeistelPermutation:
+    def __init__(self, size, seed):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self.half_bits = bits // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        self.round_keys = [_mix((seed + round_number * 0x9E3779B97F4A7C15) & MASK64) for round_number in range(ROUNDS)]
+
+    def _encrypt(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for key in self.round_keys:
+            left, right = right, left ^ (_mix(right ^ key) & self.half_mask)
+        return (left << self.half_bits) | right
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.size:
+            raise IndexError(position)
+        value = self._encrypt(position)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def __len__(self):
+        return self.size
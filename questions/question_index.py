@@ -0,0 +1,263 @@
+"""
+In-process columnar index of the question bank.
+
+Every worker keeps (id, group, subject, category, subcategory, level, type,
+updated_at) for all questions in NumPy arrays, so quiz batches are drawn with
+vectorised masks instead of ``ORDER BY RANDOM()`` over the whole table.
+The index is refreshed incrementally from ``Question.updated_at``; each
+refresh re-reads a window of ``QUESTION_INDEX_SYNC_LAG_SECONDS`` before the
+newest stamp it has seen, so rows committed late or stamped by a clock that
+runs behind are not missed.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .metadata import has_metadata_filters, metadata_q
+from .models import Question
+
+LEVEL_CODES = {value: code for code, (value, _label) in enumerate(Question.LEVEL_CHOICES)}
+NO_SUBCATEGORY = -1
+NO_MATCH = -2
+CANDIDATE_CACHE_SIZE = 256
+
+INDEX_FIELDS = ('id', 'group_id', 'subject_id', 'category_id', 'subcategory_id', 'level', 'type', 'updated_at')
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_micros(value):
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _as_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return NO_MATCH
+
+
+def bitmap_contains(bitmap, ids):
+    """Boolean mask of ``ids`` whose bit is set in a Redis-style bitmap."""
+    bits = np.frombuffer(bitmap, dtype=np.uint8)
+    found = np.zeros(len(ids), dtype=bool)
+    in_range = ids < len(bits) * 8
+    covered = ids[in_range]
+    found[in_range] = (bits[covered >> 3] >> (7 - (covered & 7))) & 1 == 1
+    return found
+
+
+def _as_id_list(values):
+    if not isinstance(values, (list, tuple)):
+        values = [values]
+    return [_as_id(value) for value in values]
+
+
+class _Columns:
+    """One consistent snapshot of the index arrays, sorted by question id."""
+
+    def __init__(self, ids, group_ids, subject_ids, category_ids, subcategory_ids, levels, types, updated_at):
+        self.ids = ids
+        self.group_ids = group_ids
+        self.subject_ids = subject_ids
+        self.category_ids = category_ids
+        self.subcategory_ids = subcategory_ids
+        self.levels = levels
+        self.types = types
+        self.updated_at = updated_at
+
+    @classmethod
+    def empty(cls):
+        return cls(*(np.empty(0, dtype=np.int64) for _ in range(8)))
+
+    def take(self, order):
+        return _Columns(*(column[order] for column in self.columns()))
+
+    def columns(self):
+        return (self.ids, self.group_ids, self.subject_ids, self.category_ids,
+                self.subcategory_ids, self.levels, self.types, self.updated_at)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class QuestionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = _Columns.empty()
+        self._candidate_cache = {}
+        self._type_codes = {}
+        self._synced_to = None
+        self._checked_at = None
+
+    @property
+    def refresh_interval(self):
+        return getattr(settings, 'QUESTION_INDEX_REFRESH_SECONDS', 5)
+
+    @property
+    def sync_lag(self):
+        return getattr(settings, 'QUESTION_INDEX_SYNC_LAG_SECONDS', 2 * self.refresh_interval)
+
+    def invalidate(self):
+        """Force the next read to check the database for changes."""
+        self._checked_at = None
+
+    def needs_refresh(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.refresh_interval
+
+    def refresh(self, force=False):
+        if not force and not self.needs_refresh():
+            return
+        with self._lock:
+            if not force and not self.needs_refresh():
+                return
+            self._checked_at = time.monotonic()
+
+            state = Question.objects.aggregate(total=Count('id'), latest=Max('updated_at'))
+            if self._synced_to is None or state['latest'] is None:
+                if state['total'] or len(self._columns):
+                    self._rebuild()
+                return
+
+            since = self._timestamp(self._synced_to) - timedelta(seconds=self.sync_lag)
+            self._merge(self._load(Question.objects.filter(updated_at__gte=since)))
+            # Deletions leave no trace in updated_at, so fall back to a full
+            # rebuild whenever the row count no longer agrees.
+            if len(self._columns) != state['total']:
+                self._rebuild()
+
+    async def arefresh(self):
+        """``refresh`` for async views; only leaves the event loop when a database check is due."""
+        if self.needs_refresh():
+            await sync_to_async(self.refresh)()
+
+    def _timestamp(self, micros):
+        return EPOCH + timedelta(microseconds=micros)
+
+    def _load(self, queryset):
+        rows = list(queryset.order_by().values_list(*INDEX_FIELDS))
+        if not rows:
+            return _Columns.empty()
+        ids, group_ids, subject_ids, category_ids, subcategory_ids, levels, types, updated_at = zip(*rows)
+        return _Columns(
+            np.array(ids, dtype=np.int64),
+            np.array(group_ids, dtype=np.int64),
+            np.array(subject_ids, dtype=np.int64),
+            np.array(category_ids, dtype=np.int64),
+            np.array([NO_SUBCATEGORY if value is None else value for value in subcategory_ids], dtype=np.int64),
+            np.array([LEVEL_CODES.get(value, NO_MATCH) for value in levels], dtype=np.int8),
+            np.array([self._type_code(value) for value in types], dtype=np.int32),
+            np.array([to_micros(value) for value in updated_at], dtype=np.int64),
+        )
+
+    def _type_code(self, value):
+        return self._type_codes.setdefault(value, len(self._type_codes))
+
+    def _rebuild(self):
+        columns = self._load(Question.objects.all())
+        self._columns = columns.take(np.argsort(columns.ids, kind='stable'))
+        self._candidate_cache = {}
+        self._synced_to = int(columns.updated_at.max()) if len(columns) else None
+
+    def _merge(self, changed):
+        if not len(changed):
+            return
+        current = self._columns
+        positions = np.searchsorted(current.ids, changed.ids)
+        positions[positions == len(current)] = 0
+        existing = (current.ids[positions] == changed.ids) if len(current) else np.zeros(len(changed), dtype=bool)
+
+        # The lag window mostly re-reads rows the index already holds; keep
+        # the candidate memo unless something actually differs.
+        same = existing.copy()
+        for target, source in zip(current.columns(), changed.columns()):
+            same[existing] &= target[positions[existing]] == source[existing]
+        if same.all():
+            return
+        changed, positions, existing = changed.take(~same), positions[~same], existing[~same]
+
+        merged = _Columns(*(column.copy() for column in current.columns()))
+        for target, source in zip(merged.columns(), changed.columns()):
+            target[positions[existing]] = source[existing]
+
+        added = ~existing
+        if added.any():
+            merged = _Columns(*(
+                np.concatenate([target, source[added]]) for target, source in zip(merged.columns(), changed.columns())
+            ))
+            merged = merged.take(np.argsort(merged.ids, kind='stable'))
+
+        self._columns = merged
+        self._candidate_cache = {}
+        self._synced_to = max(self._synced_to, int(changed.updated_at.max()))
+
+    def candidates(self, filters, cache_key=None, refresh=True):
+        """
+        Ids of the questions a quiz run over ``filters`` draws from, sorted
+        ascending: the run's group and subject, narrowed by levels, by
+        subcategories (or else categories) and by metadata predicates.
+        Results are memoised per ``cache_key`` (a filter hash) until the
+        index changes.
+        """
+        if refresh:
+            self.refresh()
+        cache = self._candidate_cache
+        if cache_key is not None and cache_key in cache:
+            return cache[cache_key]
+        columns = self._columns
+
+        mask = (columns.group_ids == _as_id(filters.get('group_id'))) & (columns.subject_ids == _as_id(filters.get('subject_id')))
+
+        levels = filters.get('levels') or []
+        if levels:
+            mask &= np.isin(columns.levels, [LEVEL_CODES.get(level, NO_MATCH) for level in levels])
+
+        subcategory_ids = filters.get('subcategory_ids') or []
+        category_ids = filters.get('category_ids') or []
+        if subcategory_ids:
+            mask &= np.isin(columns.subcategory_ids, _as_id_list(subcategory_ids))
+        elif category_ids:
+            mask &= np.isin(columns.category_ids, _as_id_list(category_ids))
+
+        ids = columns.ids[mask]
+        if has_metadata_filters(filters) and len(ids):
+            # Metadata is not held in the index; the GIN index on it answers
+            # the predicate within the run's subject, and the result is
+            # memoised like the rest.
+            matching = (
+                Question.objects.filter(metadata_q(filters), group_id=filters['group_id'], subject_id=filters['subject_id'])
+                .values_list('id', flat=True)
+            )
+            ids = np.intersect1d(ids, np.fromiter(matching, dtype=ids.dtype))
+        if cache_key is not None:
+            if len(cache) >= CANDIDATE_CACHE_SIZE:
+                cache.clear()
+            cache[cache_key] = ids
+        return ids
+
+    async def acandidates(self, filters, cache_key=None):
+        """``candidates`` for async views, after ``arefresh``; metadata filters need the database."""
+        if has_metadata_filters(filters) and (cache_key is None or cache_key not in self._candidate_cache):
+            return await sync_to_async(self.candidates)(filters, cache_key=cache_key, refresh=False)
+        return self.candidates(filters, cache_key=cache_key, refresh=False)
+
+    def updated_at_for(self, question_ids, refresh=True):
+        """Map each indexed id of ``question_ids`` to its ``updated_at`` in microseconds."""
+        if refresh:
+            self.refresh()
+        columns = self._columns
+        if not len(columns) or not len(question_ids):
+            return {}
+        ids = np.asarray(question_ids, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(columns.ids, ids), len(columns) - 1)
+        found = columns.ids[positions] == ids
+        return dict(zip(ids[found].tolist(), columns.updated_at[positions[found]].tolist()))
+
+
+question_index = QuestionIndex()
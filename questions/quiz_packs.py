@@ -0,0 +1,117 @@
+"""
+Quiz packs: every question of a filter in one gzipped JSON file.
+
+A pack is named after a hash of its contents (the candidate ids, each one's
+``updated_at`` and the taxonomy version), all known from the in-process
+question index, so finding the current pack for a filter costs no database
+query. Editing any included question, or adding one to the filter, yields a
+new name and the pack is rebuilt once; a Redis lock keeps a class of students
+asking at the same moment from building it concurrently.
+
+Files are written to ``QUIZ_PACK_ROOT`` and served by nginx through
+``X-Accel-Redirect`` when ``QUIZ_PACK_ACCEL_REDIRECT`` is on.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+from .payload_cache import json_list, payload_cache
+from .question_index import question_index
+from .quiz_state import filter_hash
+
+ACCEL_REDIRECT_PREFIX = '/internal/quiz-packs/'
+BUILD_LOCK_TIMEOUT = 60
+
+
+class PackTooLarge(Exception):
+    pass
+
+
+class QuizPack:
+    def __init__(self, content_hash, path, count):
+        self.content_hash = content_hash
+        self.path = path
+        self.count = count
+
+    @property
+    def etag(self):
+        return f'"{self.content_hash}"'
+
+    @property
+    def accel_redirect(self):
+        return f'{ACCEL_REDIRECT_PREFIX}{self.content_hash}.json'
+
+
+def pack_root():
+    return Path(settings.QUIZ_PACK_ROOT)
+
+
+def content_hash(filters, pool, versions, taxonomy_version):
+    digest = hashlib.sha256()
+    digest.update(f'{filter_hash(filters)}:{taxonomy_version}:'.encode())
+    for question_id in pool.tolist():
+        digest.update(b'%d:%d,' % (question_id, versions.get(question_id, 0)))
+    return digest.hexdigest()[:40]
+
+
+def get_pack(filters):
+    """The current pack for ``filters``, built first if it does not exist yet."""
+    pool = question_index.candidates(filters, cache_key=filter_hash(filters))
+    if len(pool) > settings.QUIZ_PACK_MAX_QUESTIONS:
+        raise PackTooLarge(len(pool))
+
+    taxonomy_version = payload_cache.taxonomy_version()
+    versions = question_index.updated_at_for(pool, refresh=False)
+    name = content_hash(filters, pool, versions, taxonomy_version)
+    pack = QuizPack(name, pack_root() / f'{name}.json.gz', len(pool))
+
+    if pack.path.exists():
+        os.utime(pack.path)
+        return pack
+
+    with get_redis_connection('default').lock(f'quiz:pack:build:{pack.content_hash}', timeout=BUILD_LOCK_TIMEOUT):
+        if not pack.path.exists():
+            _write(pack, filters, pool)
+    return pack
+
+
+def _write(pack, filters, pool):
+    ids = pool.tolist()
+    payloads = payload_cache.get_many(ids)
+    body = b'{"filters":%s,"count":%d,"questions":%s}' % (
+        json.dumps(filters, sort_keys=True).encode(),
+        len(payloads),
+        json_list([payloads[question_id] for question_id in ids if question_id in payloads]),
+    )
+    pack.path.parent.mkdir(parents=True, exist_ok=True)
+    # Write beside the target and rename, so nginx never serves half a file.
+    fd, temp_path = tempfile.mkstemp(dir=pack.path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(gzip.compress(body, mtime=0))
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, pack.path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def prune(max_idle_seconds):
+    """Delete packs not served for ``max_idle_seconds``; returns how many were removed."""
+    root = pack_root()
+    if not root.exists():
+        return 0
+    cutoff = time.time() - max_idle_seconds
+    removed = 0
+    for path in root.glob('*.json.gz'):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
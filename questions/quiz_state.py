@@ -0,0 +1,305 @@
+"""
+Quiz run state kept in Redis instead of the database session.
+
+A quiz run is one Redis hash holding its filters, the filter hash, a random
+seed and a position. The n-th question of a run is the n-th element of a
+seeded Feistel permutation over the candidate ids of the filter (see
+``questions.permutation``), so the state stays a few bytes no matter how large
+the bank is and any worker can serve the next question.
+
+Served questions are recorded as bits in a Redis bitmap indexed by question
+id; runs started with an access token share one bitmap per token, so students
+do not see repeats across sessions. The next few candidates of the
+permutation are sent to a compare-and-set script that tests and sets their
+seen bits inside Redis and moves the cursor, so two parallel requests for the
+same run can never receive the same question and the bitmap (62 KB at 500k
+ids) stays in Redis. It is only fetched when a run turns out to be mostly
+seen, to skip seen ids locally and to tell when the filter is exhausted.
+"""
+import hashlib
+import json
+import re
+import secrets
+
+from django.conf import settings
+from django.utils.crypto import get_random_string
+from django_redis import get_redis_connection
+
+from .async_redis import get_async_redis
+from .permutation import FeistelPermutation
+from .question_index import bitmap_contains
+
+SESSION_ID_LENGTH = 32
+SESSION_ID_CHARS = 'abcdefghijklmnopqrstuvwxyz0123456789'
+SESSION_ID_RE = re.compile(r'^[a-z0-9]{%d}$' % SESSION_ID_LENGTH)
+MAX_CLAIM_ATTEMPTS = 5
+
+# Candidate ids sent per claim when the seen bitmap is not at hand.
+CLAIM_WINDOW = 32
+
+# Move the cursor from ARGV[2] if nobody else did, and claim up to ARGV[3] of
+# the candidates (ARGV[7], ARGV[8]: the position after a candidate and its
+# id, and so on) whose seen bit is still clear, setting it. The cursor ends
+# after the last claimed candidate, or at ARGV[6] when fewer were free.
+# Returns the new position followed by the claimed ids.
+CLAIM_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'epoch') ~= ARGV[1] or redis.call('HGET', KEYS[1], 'position') ~= ARGV[2] then
+    return false
+end
+local count = tonumber(ARGV[3])
+local result = {ARGV[6]}
+for i = 7, #ARGV, 2 do
+    if redis.call('SETBIT', KEYS[2], ARGV[i + 1], 1) == 0 then
+        result[#result + 1] = ARGV[i + 1]
+        if #result > count then
+            result[1] = ARGV[i]
+            break
+        end
+    end
+end
+redis.call('HSET', KEYS[1], 'position', result[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return result
+"""
+
+# Start a new pass over the (possibly grown) candidate pool once the current
+# permutation is exhausted.
+RESET_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'epoch') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'epoch', tonumber(ARGV[1]) + 1, 'seed', ARGV[2], 'size', ARGV[3], 'position', 0)
+return 1
+"""
+
+
+def filter_hash(filters):
+    return hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+
+
+def is_seen(bitmap, question_id):
+    byte = question_id >> 3
+    return byte < len(bitmap) and bool(bitmap[byte] & (0x80 >> (question_id & 7)))
+
+
+class QuizStateStore:
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._scripts = {}
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'QUIZ_STATE_TTL', 60 * 60 * 24)
+
+    @property
+    def seen_ttl(self):
+        return getattr(settings, 'QUIZ_SEEN_TTL', 60 * 60 * 24 * 90)
+
+    def _redis(self):
+        # django-redis hands out clients backed by one pooled connection per worker.
+        return get_redis_connection(self.alias)
+
+    def _script(self, source, redis):
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = redis.register_script(source)
+        return script
+
+    def _run_script(self, source, keys, args):
+        redis = self._redis()
+        return self._script(source, redis)(keys=keys, args=args, client=redis)
+
+    def _state_key(self, session_id):
+        return f'quiz:{session_id}'
+
+    def seen_key(self, session_id, token_key=None):
+        if token_key:
+            return f'quiz:seen:token:{token_key}'
+        return f'quiz:{session_id}:seen'
+
+    def is_valid_id(self, session_id):
+        return bool(session_id) and bool(SESSION_ID_RE.match(session_id))
+
+    def _new_state(self, filters, size, token_key):
+        session_id = get_random_string(SESSION_ID_LENGTH, SESSION_ID_CHARS)
+        state = {
+            'filters': filters,
+            'filter_hash': filter_hash(filters),
+            'seen_key': self.seen_key(session_id, token_key),
+            'seed': secrets.randbits(63),
+            'size': size,
+            'position': 0,
+            'epoch': 0,
+        }
+        return session_id, state, {**state, 'filters': json.dumps(filters)}
+
+    def _parse(self, fields):
+        if not fields:
+            return None
+        raw = {key.decode(): value.decode() for key, value in fields.items()}
+        return {
+            'filters': json.loads(raw['filters']),
+            'filter_hash': raw['filter_hash'],
+            'seen_key': raw['seen_key'],
+            'seed': int(raw['seed']),
+            'size': int(raw['size']),
+            'position': int(raw['position']),
+            'epoch': int(raw['epoch']),
+        }
+
+    def _walk(self, state, pool, limit, seen=None):
+        """
+        Up to ``limit`` candidate ids from the cursor on, each with the
+        position after it, leaving out ids set in ``seen`` when the bitmap is
+        at hand; and the position the walk stopped at.
+        """
+        permutation = FeistelPermutation(state['size'], state['seed'])
+        position = state['position']
+        candidates = []
+        while len(candidates) < limit and position < state['size']:
+            index = permutation[position]
+            position += 1
+            if index < len(pool) and not (seen is not None and is_seen(seen, int(pool[index]))):
+                candidates.append((position, int(pool[index])))
+        return candidates, position
+
+    def _window(self, wanted, seen):
+        return wanted if seen is not None else max(2 * wanted, CLAIM_WINDOW)
+
+    def _claim_call(self, session_id, state, candidates, end, wanted):
+        keys = [self._state_key(session_id), state['seen_key']]
+        args = [state['epoch'], state['position'], wanted, self.ttl, self.seen_ttl, end]
+        for position, question_id in candidates:
+            args += [position, question_id]
+        return keys, args
+
+    def _claimed(self, state, result):
+        state['position'] = int(result[0])
+        return [int(question_id) for question_id in result[1:]]
+
+    def create(self, filters, size, token_key=None):
+        """Start a run over ``size`` candidates and return ``(session_id, state)``."""
+        session_id, state, mapping = self._new_state(filters, size, token_key)
+        pipe = self._redis().pipeline()
+        pipe.hset(self._state_key(session_id), mapping=mapping)
+        pipe.expire(self._state_key(session_id), self.ttl)
+        pipe.execute()
+        return session_id, state
+
+    def load(self, session_id):
+        """The run's state, or None."""
+        if not self.is_valid_id(session_id):
+            return None
+        return self._parse(self._redis().hgetall(self._state_key(session_id)))
+
+    def seen(self, state):
+        """The run's seen bitmap bytes."""
+        return self._redis().get(state['seen_key']) or b''
+
+    def advance(self, session_id, state, pool, count=1):
+        """
+        Claim the next ``count`` unseen question ids of the run from ``pool``,
+        the filter's candidate ids sorted ascending. Returns fewer ids (or
+        none) once every candidate has been seen.
+        """
+        claimed, seen = [], None
+        for _attempt in range(MAX_CLAIM_ATTEMPTS):
+            wanted = count - len(claimed)
+            candidates, end = self._walk(state, pool, self._window(wanted, seen), seen)
+            if candidates:
+                result = self._run_script(CLAIM_SCRIPT, *self._claim_call(session_id, state, candidates, end, wanted))
+                if result is not None:
+                    claimed += self._claimed(state, result)
+                    if len(claimed) == count:
+                        return claimed
+                    # Most of the window had been seen: skip seen ids locally.
+                    seen = self.seen(state)
+                    continue
+            elif claimed:
+                return claimed
+            else:
+                seen = self.seen(state) if seen is None else seen
+                if bitmap_contains(seen, pool).all():
+                    return []
+                self._run_script(RESET_SCRIPT, [self._state_key(session_id)], [state['epoch'], secrets.randbits(63), len(pool)])
+
+            state = self.load(session_id)
+            if state is None:
+                return claimed
+        return claimed
+
+    def clear(self, session_id, forget_seen=False):
+        state = self.load(session_id)
+        if state is None:
+            return
+        keys = [self._state_key(session_id), self.seen_key(session_id)]
+        if forget_seen:
+            keys.append(state['seen_key'])
+        self._redis().delete(*keys)
+
+
+class AsyncQuizStateStore(QuizStateStore):
+    """The same store for async views, talking to Redis through redis.asyncio."""
+
+    def _redis(self):
+        return get_async_redis(self.alias)
+
+    async def _run_script(self, source, keys, args):
+        redis = self._redis()
+        return await self._script(source, redis)(keys=keys, args=args, client=redis)
+
+    async def create(self, filters, size, token_key=None):
+        session_id, state, mapping = self._new_state(filters, size, token_key)
+        pipe = self._redis().pipeline()
+        pipe.hset(self._state_key(session_id), mapping=mapping)
+        pipe.expire(self._state_key(session_id), self.ttl)
+        await pipe.execute()
+        return session_id, state
+
+    async def load(self, session_id):
+        if not self.is_valid_id(session_id):
+            return None
+        return self._parse(await self._redis().hgetall(self._state_key(session_id)))
+
+    async def seen(self, state):
+        return await self._redis().get(state['seen_key']) or b''
+
+    async def advance(self, session_id, state, pool, count=1):
+        claimed, seen = [], None
+        for _attempt in range(MAX_CLAIM_ATTEMPTS):
+            wanted = count - len(claimed)
+            candidates, end = self._walk(state, pool, self._window(wanted, seen), seen)
+            if candidates:
+                result = await self._run_script(CLAIM_SCRIPT, *self._claim_call(session_id, state, candidates, end, wanted))
+                if result is not None:
+                    claimed += self._claimed(state, result)
+                    if len(claimed) == count:
+                        return claimed
+                    seen = await self.seen(state)
+                    continue
+            elif claimed:
+                return claimed
+            else:
+                seen = await self.seen(state) if seen is None else seen
+                if bitmap_contains(seen, pool).all():
+                    return []
+                await self._run_script(RESET_SCRIPT, [self._state_key(session_id)], [state['epoch'], secrets.randbits(63), len(pool)])
+
+            state = await self.load(session_id)
+            if state is None:
+                return claimed
+        return claimed
+
+    async def clear(self, session_id, forget_seen=False):
+        state = await self.load(session_id)
+        if state is None:
+            return
+        keys = [self._state_key(session_id), self.seen_key(session_id)]
+        if forget_seen:
+            keys.append(state['seen_key'])
+        await self._redis().delete(*keys)
+
+
+quiz_state = QuizStateStore()
+async_quiz_state = AsyncQuizStateStore()
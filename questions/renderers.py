@@ -0,0 +1,71 @@
+"""
+JSON rendering with orjson.
+
+``FastJSONRenderer`` is a drop-in for DRF's ``JSONRenderer``: same compact
+UTF-8 output, with anything orjson does not handle natively (datetimes,
+decimals, lazy strings, ...) passed to DRF's own encoder. Indented output,
+installs without orjson and data orjson refuses (integers beyond 64 bits,
+which question metadata may hold) fall back to the stdlib encoder. orjson
+writes NaN and Infinity as ``null`` where DRF raises; they cannot come from
+the database, which stores JSON without them.
+
+``stream_json`` renders a list envelope with its items encoded one at a time
+and yielded in chunks, for ``StreamingHttpResponse``. ``GZipMiddleware``
+compresses streaming responses chunk by chunk, so neither the JSON nor its
+compressed copy is ever held in full.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_encoder = encoders.JSONEncoder()
+
+
+def dumps(data):
+    """``data`` as compact JSON bytes, exactly as ``JSONRenderer`` would write it."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    try:
+        content = orjson.dumps(data, default=_encoder.default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+    except orjson.JSONEncodeError:
+        return JSONRenderer().render(data)
+    # Like JSONRenderer, keep the output a valid JavaScript literal.
+    if b'\xe2\x80' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+def stream_json(envelope, items, key='results'):
+    """
+    Yield ``envelope`` as JSON with ``items`` streamed in as ``envelope[key]``,
+    in chunks of about ``STREAM_CHUNK_SIZE`` bytes.
+    """
+    head = dumps({name: value for name, value in envelope.items() if name != key})
+    chunk = [head[:-1] + (b',' if len(head) > 2 else b'') + dumps(key) + b':[']
+    size = 0
+    separator = b''
+    for item in items:
+        encoded = dumps(item)
+        chunk.append(separator + encoded)
+        separator = b','
+        size += len(encoded)
+        if size >= STREAM_CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk, size = [], 0
+    chunk.append(b']}')
+    yield b''.join(chunk)
@@ -0,0 +1,62 @@
+"""
+Full-text search over the question bank.
+
+``Question.search_document`` is a GIN-indexed ``tsvector`` of the question's
+metadata strings (weight A), its denormalized taxonomy names (B) and its
+type, level and id (C). It is written by ``refresh_search_documents`` from ``signals.py``
+whenever a question is saved or bulk created, or a taxonomy node it belongs
+to is renamed, so searching never touches the joined tables.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F
+from rest_framework import filters
+
+SEARCH_CONFIG = 'simple'
+SEARCH_TERM_RE = re.compile(r'\w+')
+
+DOCUMENT_SQL = """
+    setweight(jsonb_to_tsvector('{config}', q.metadata, '["string", "numeric"]'), 'A') ||
+    setweight(to_tsvector('{config}', concat_ws(' ',
+        q.group_name, q.subject_name, q.category_name, q.subcategory_name
+    )), 'B') ||
+    setweight(to_tsvector('{config}', concat_ws(' ', q.type, q.level, q.id)), 'C')
+""".format(config=SEARCH_CONFIG)
+
+REFRESH_COLUMNS = ('id', 'group_id', 'subject_id', 'category_id', 'subcategory_id')
+
+
+def refresh_search_documents(column='id', values=()):
+    """Rebuild ``search_document`` for the questions whose ``column`` is in ``values``."""
+    if column not in REFRESH_COLUMNS:
+        raise ValueError(column)
+    values = list(values)
+    if not values:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE questions_question q SET search_document = {DOCUMENT_SQL} WHERE q.{column} = ANY(%s)',
+            [values],
+        )
+
+
+def search_query(text):
+    """A prefix query matching every word of ``text``, or None if it has none."""
+    terms = SEARCH_TERM_RE.findall(text)
+    if not terms:
+        return None
+    return SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+
+
+class QuestionSearchFilter(filters.SearchFilter):
+    """``?search=`` over ``search_document``, best matches first."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = search_query(' '.join(self.get_search_terms(request)))
+        if query is None:
+            return queryset
+        return queryset.filter(search_document=query).annotate(
+            search_rank=SearchRank(F('search_document'), query),
+        ).order_by('-search_rank', '-created_at')
@@ -1,4 +1,4 @@
-from .models import Group, Subject, Category, SubCategory, Question
+from .models import Group, Subject, Category, SubCategory, Question, ImportJob
 from rest_framework import serializers
 from django.core.exceptions import ValidationError
 from django.db.models import Q
@@ -212,10 +212,11 @@ class QuestionWriteSerializer(serializers.ModelSerializer):
 
 # Question Detail Serializer
 class QuestionDetailSerializer(serializers.ModelSerializer):
-    group = serializers.SlugRelatedField(slug_field='name',read_only=True )
-    subject = serializers.SlugRelatedField(slug_field='name',read_only=True)
-    category = serializers.SlugRelatedField(slug_field='name' ,read_only=True)
-    subcategory = serializers.SlugRelatedField(slug_field='name', read_only=True)
+    # Denormalized names on the question row; no joins needed.
+    group = serializers.CharField(source='group_name', read_only=True)
+    subject = serializers.CharField(source='subject_name', read_only=True)
+    category = serializers.CharField(source='category_name', read_only=True)
+    subcategory = serializers.CharField(source='subcategory_name', read_only=True)
     class Meta:
         model = Question
         fields = ['id', 'group', 'subject', 'category', 'subcategory', 'level', 'type', 'metadata', 'created_at', 'updated_at']
@@ -224,12 +225,31 @@ class QuestionDetailSerializer(serializers.ModelSerializer):
 
 #question list serializer
 class QuestionListSerializer(serializers.ModelSerializer):
-    group = serializers.SlugRelatedField(slug_field='name',read_only=True )
-    subject = serializers.SlugRelatedField(slug_field='name',read_only=True)
-    category = serializers.SlugRelatedField(slug_field='name' ,read_only=True)
-    subcategory = serializers.SlugRelatedField(slug_field='name', read_only=True)
+    # Denormalized names on the question row; no joins needed.
+    group = serializers.CharField(source='group_name', read_only=True)
+    subject = serializers.CharField(source='subject_name', read_only=True)
+    category = serializers.CharField(source='category_name', read_only=True)
+    subcategory = serializers.CharField(source='subcategory_name', read_only=True)
     class Meta:
         model = Question
         fields = ['id', 'group', 'subject', 'category', 'subcategory', 'level', 'type', 'created_at', 'metadata', 'updated_at']
         read_only_fields = fields
-    
\ No newline at end of file
+
+
+# Import Job Serializer
+class ImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = ['id', 'status', 'format', 'progress', 'total_rows', 'processed_rows', 'created_rows', 'failed_rows', 'errors', 'message', 'attempts', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        """Percentage of the upload's rows processed so far."""
+        if obj.status == 'succeeded':
+            return 100.0
+        if not obj.total_rows:
+            return 0.0
+        return round(min(100.0, 100.0 * obj.processed_rows / obj.total_rows), 1)
+
@@ -0,0 +1,87 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import generations
+from .models import Category, Group, Question, QuestionCount, SubCategory, Subject, questions_bulk_created, taxonomy_bulk_created
+from .payload_cache import payload_cache
+from .question_index import question_index
+from .search import refresh_search_documents
+
+TAXONOMY_RELATIONS = {Group: 'group', Subject: 'subject', Category: 'category', SubCategory: 'subcategory'}
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    # Other workers pick the change up on their next timed refresh.
+    question_index.invalidate()
+    payload_cache.forget(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def count_saved_question(sender, instance, created, **kwargs):
+    new_key = instance.count_key()
+    old_key = getattr(instance, '_count_key', None)
+    if created:
+        QuestionCount.objects.apply_deltas({new_key: 1})
+    elif old_key is not None and old_key != new_key:
+        QuestionCount.objects.apply_deltas({old_key: -1, new_key: 1})
+    instance._count_key = new_key
+
+
+@receiver(post_delete, sender=Question)
+def count_deleted_question(sender, instance, **kwargs):
+    QuestionCount.objects.apply_deltas({getattr(instance, '_count_key', None) or instance.count_key(): -1})
+
+
+@receiver(post_save, sender=Question)
+def index_saved_question(sender, instance, **kwargs):
+    refresh_search_documents('id', [instance.pk])
+
+
+@receiver(questions_bulk_created, sender=Question)
+def questions_added_in_bulk(sender, instances, **kwargs):
+    question_index.invalidate()
+    refresh_search_documents('id', [instance.pk for instance in instances])
+    QuestionCount.objects.apply_deltas(Counter(instance.count_key() for instance in instances))
+    for instance in instances:
+        instance._count_key = instance.count_key()
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=Subject)
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=SubCategory)
+def note_taxonomy_rename(sender, instance, **kwargs):
+    instance._renamed = instance.is_renamed()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=SubCategory)
+def propagate_taxonomy_rename(sender, instance, **kwargs):
+    # Questions carry their taxonomy names, and their search documents embed
+    # them; both are rewritten with one statement each.
+    if getattr(instance, '_renamed', False):
+        relation = TAXONOMY_RELATIONS[sender]
+        Question.objects.filter(**{f'{relation}_id': instance.pk}).update(**{f'{relation}_name': instance.name})
+        refresh_search_documents(f'{relation}_id', [instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Group)
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=SubCategory)
+@receiver([post_save, post_delete], sender=Question)
+@receiver(taxonomy_bulk_created)
+@receiver(questions_bulk_created, sender=Question)
+def bump_generation(sender, signal, instance=None, **kwargs):
+    counters = [sender]
+    if sender in TAXONOMY_RELATIONS and (signal is post_delete or getattr(instance, '_renamed', False)):
+        counters.append(generations.TAXONOMY_NAMES)
+    # Bump again on commit so nothing cached from the uncommitted state sticks.
+    generations.bump(*counters)
+    transaction.on_commit(lambda: generations.bump(*counters))
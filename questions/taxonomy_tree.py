@@ -0,0 +1,71 @@
+"""
+In-memory snapshot of the whole Group -> Subject -> Category -> SubCategory
+tree, rendered once to JSON bytes.
+
+The snapshot is tagged with the generations of the taxonomy models kept in
+Redis (see ``generations.py``), so serving it costs one Redis MGET and no
+database queries until something changes. The ETag is a hash of the rendered
+body, so it agrees across workers.
+"""
+import hashlib
+import threading
+
+from . import compression, generations
+from .models import Category, Group, SubCategory, Subject
+from .renderers import dumps
+
+
+class TaxonomySnapshot:
+    def __init__(self, version, content):
+        self.version = version
+        self.content = content
+        self.etag = '"%s"' % hashlib.sha1(content).hexdigest()
+        self._encoded = {'identity': content}
+
+    def encoded(self, encoding):
+        """The body in ``encoding``, compressed at most once per snapshot."""
+        if encoding not in self._encoded:
+            self._encoded[encoding] = compression.compress(self.content, encoding)
+        return self._encoded[encoding]
+
+
+class TaxonomyTree:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def get(self):
+        version = generations.current(*generations.TAXONOMY_MODELS)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshot = TaxonomySnapshot(version, self._render())
+        return snapshot
+
+    def _render(self):
+        subcategories = {}
+        for row in SubCategory.objects.order_by('name', 'id').values('id', 'name', 'category_id'):
+            subcategories.setdefault(row.pop('category_id'), []).append(row)
+
+        categories = {}
+        for row in Category.objects.order_by('name', 'id').values('id', 'name', 'subject_id'):
+            row['subcategories'] = subcategories.get(row['id'], [])
+            categories.setdefault(row.pop('subject_id'), []).append(row)
+
+        subjects = {}
+        for row in Subject.objects.order_by('name', 'id').values('id', 'name', 'description', 'group_id'):
+            row['categories'] = categories.get(row['id'], [])
+            subjects.setdefault(row.pop('group_id'), []).append(row)
+
+        groups = []
+        for row in Group.objects.order_by('name', 'id').values('id', 'name', 'description'):
+            row['subjects'] = subjects.get(row['id'], [])
+            groups.append(row)
+
+        return dumps({'groups': groups})
+
+
+taxonomy_tree = TaxonomyTree()
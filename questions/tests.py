@@ -2,9 +2,24 @@ import json
 from django.test import TestCase
 from django.contrib.auth.models import User
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
-from .models import Group, Subject, Category, SubCategory, Question
+from io import StringIO
+import gzip
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from django.utils import timezone
+from django.test import override_settings
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.management import call_command
+from django.core import serializers
+from unittest import mock
+from .pagination import EstimatedCountPaginator
+from .models import Group, Subject, Category, SubCategory, Question, QuestionCount, ImportJob
+from . import import_jobs
 
 
 class QuestionsAPITestCase(APITestCase):
@@ -35,7 +50,7 @@ class QuestionsAPITestCase(APITestCase):
         url = reverse('group-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.json()), 1)
 
     def test_group_create(self):
         url = reverse('group-list')
@@ -44,6 +59,263 @@ class QuestionsAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Group.objects.count(), 2)
 
+    def test_list_caches_follow_writes(self):
+        url = reverse('subcategory-list-by-category', kwargs={'category_id': self.category.id})
+        self.assertEqual(self.client.get(url).json()['count'], 1)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        SubCategory.objects.bulk_create([SubCategory(group=self.group, subject=self.subject, category=self.category, name='Bulk SubCategory')])
+        self.assertEqual(self.client.get(url).json()['count'], 2)
+
+        self.category.name = 'Renamed Category'
+        self.category.save()
+        self.assertEqual(self.client.get(url).json()['results'][0]['category'], 'Renamed Category')
+
+    def test_list_conditional_get(self):
+        url = reverse('category-detail-view', kwargs={'subject_id': self.subject.id})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        url = reverse('recent-questions-view')
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.question.level = 'medium'
+        self.question.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        etag = self.client.get(url)['ETag']
+        self.category.name = 'Renamed Category'
+        self.category.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        etag = self.client.get(url)['ETag']
+        Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq').delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_keyset_pagination_walks_both_ways(self):
+        for i in range(4):
+            Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq')
+        expected = list(Question.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        url = reverse('recent-questions-view')
+
+        response = self.client.get(url, {'cursor': '', 'page_size': 2})
+        self.assertNotIn('count', response.json())
+        self.assertIsNone(response.json()['previous'])
+        pages = [[question['id'] for question in response.json()['results']]]
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'])
+            pages.append([question['id'] for question in response.json()['results']])
+        self.assertEqual(sum(pages, []), expected)
+
+        response = self.client.get(response.json()['previous'])
+        self.assertEqual([question['id'] for question in response.json()['results']], pages[-2])
+
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        for name in ['Group B', 'Group A', 'Group C']:
+            Group.objects.create(name=name)
+        response = self.client.get(reverse('group-list'), {'cursor': '', 'page_size': 3})
+        self.assertEqual([group['name'] for group in response.json()['results']], ['Group A', 'Group B', 'Group C'])
+
+    def test_dashboard_count_is_estimated_above_threshold(self):
+        url = reverse('recent-questions-view')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertFalse(response.json()['count_estimated'])
+
+        with override_settings(ESTIMATED_COUNT_THRESHOLD=0):
+            response = self.client.get(url, {'level': 'easy'})
+        self.assertTrue(response.json()['count_estimated'])
+        self.assertEqual([question['id'] for question in response.json()['results']], [self.question.id])
+
+    def test_rows_past_a_low_count_estimate_are_reachable(self):
+        for i in range(4):
+            Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq', metadata={'n': i})
+        url = reverse('recent-questions-view')
+        with override_settings(ESTIMATED_COUNT_THRESHOLD=0), mock.patch.object(EstimatedCountPaginator, 'estimate', return_value=2):
+            response = self.client.get(url, {'level': 'easy', 'page_size': 2})
+            self.assertEqual((response.json()['count'], response.json()['count_estimated']), (2, True))
+            seen = [question['id'] for question in response.json()['results']]
+            while response.json()['next']:
+                response = self.client.get(response.json()['next'])
+                seen += [question['id'] for question in response.json()['results']]
+            self.assertEqual(sorted(seen), sorted(Question.objects.values_list('id', flat=True)))
+            self.assertEqual(self.client.get(url, {'level': 'easy', 'page_size': 2, 'page': 4}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_dashboard_full_text_search(self):
+        other = Question.objects.create(
+            group=self.group, subject=self.subject, category=self.category,
+            level='medium', type='mcq', metadata={'question': 'Photosynthesis happens where?'}
+        )
+        url = reverse('recent-questions-view')
+        response = self.client.get(url, {'search': 'photosyn'})
+        self.assertEqual([question['id'] for question in response.json()['results']], [other.id])
+
+        response = self.client.get(url, {'search': 'test subcat'})
+        self.assertEqual([question['id'] for question in response.json()['results']], [self.question.id])
+
+        self.category.name = 'Biology'
+        self.category.save()
+        response = self.client.get(url, {'search': 'biology photosynthesis'})
+        self.assertEqual([question['id'] for question in response.json()['results']], [other.id])
+
+    def test_search_document_reads(self):
+        self.assertIn('subcat', Question.objects.get(pk=self.question.pk).search_document)
+        self.assertIn('subcat', Question.objects.only('id').get(pk=self.question.pk).search_document)
+        dumped = json.loads(serializers.serialize('json', Question.objects.all()))
+        self.assertEqual([item['pk'] for item in dumped], [self.question.pk])
+
+    def test_dashboard_metadata_filters(self):
+        other = Question.objects.create(
+            group=self.group, subject=self.subject, category=self.category,
+            level='medium', type='written', metadata={'question': 'Explain osmosis.', 'points': 5}
+        )
+        url = reverse('recent-questions-view')
+        response = self.client.get(url, {'metadata': '{"answer": "4"}'})
+        self.assertEqual([question['id'] for question in response.json()['results']], [self.question.id])
+
+        response = self.client.get(url, {'metadata_has_keys': 'points'})
+        self.assertEqual([question['id'] for question in response.json()['results']], [other.id])
+
+        response = self.client.get(url, {'metadata_path': '$.points > 3'})
+        self.assertEqual([question['id'] for question in response.json()['results']], [other.id])
+
+        response = self.client.get(url, {'metadata_path': '$.points >'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_question_reads_use_denormalized_names(self):
+        url = reverse('recent-questions-view')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse([query for query in queries if 'questions_question' in query['sql'] and 'JOIN' in query['sql']])
+        self.assertEqual(response.json()['results'][0]['subcategory'], 'Test SubCategory')
+
+        self.subcategory.name = 'Renamed SubCategory'
+        self.subcategory.save()
+        self.question.refresh_from_db()
+        self.assertEqual(self.question.subcategory_name, 'Renamed SubCategory')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'][0]['subcategory'], 'Renamed SubCategory')
+
+    def test_values_serializers_match_drf_serializers(self):
+        from .serializers import CategoryReadSerializer, QuestionDetailSerializer, QuestionListSerializer, SubCategoryReadSerializer
+        from .values_serializers import CategoryReadValues, QuestionDetailValues, QuestionListValues, SubCategoryReadValues
+        Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='medium', type='mcq', metadata={'question': 'No subcategory'})
+        pairs = [
+            (QuestionListValues, QuestionListSerializer, Question.objects.order_by('id')),
+            (QuestionDetailValues, QuestionDetailSerializer, Question.objects.order_by('id')),
+            (SubCategoryReadValues, SubCategoryReadSerializer, SubCategory.objects.order_by('id')),
+            (CategoryReadValues, CategoryReadSerializer, Category.objects.order_by('id')),
+        ]
+        for values_serializer, serializer, queryset in pairs:
+            expected = json.loads(json.dumps(serializer(queryset, many=True).data))
+            self.assertEqual(values_serializer.serialize(values_serializer.values(queryset)), expected)
+
+    def test_dashboard_streams_large_pages(self):
+        url = reverse('recent-questions-view')
+        expected = self.client.get(url).json()
+
+        with override_settings(STREAMING_MIN_PAGE_SIZE=1):
+            response = self.client.get(url + '?page_size=100', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(b''.join(response.streaming_content))), expected)
+
+    def test_question_export_streams_ndjson(self):
+        other = Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='medium', type='mcq')
+        url = reverse('question-export')
+        response = self.client.get(url, {'level': 'medium'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [other.id])
+
+        out = StringIO()
+        call_command('export_questions', filter=['subject__id=%d' % self.subject.id], chunk_size=1, stdout=out, stderr=StringIO())
+        self.assertEqual([json.loads(line)['id'] for line in out.getvalue().splitlines()], [self.question.id, other.id])
+
+    def test_sparse_fieldsets(self):
+        url = reverse('recent-questions-view')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'fields': 'id,level,type'})
+        self.assertEqual(response.json()['results'], [{'id': self.question.id, 'level': 'easy', 'type': 'mcq'}])
+        self.assertFalse([query for query in queries if '"metadata"' in query['sql']])
+
+        response = self.client.get(url, {'exclude': 'metadata,updated_at'})
+        self.assertNotIn('metadata', response.json()['results'][0])
+        self.assertIn('created_at', response.json()['results'][0])
+
+        url = reverse('category-detail-view', kwargs={'subject_id': self.subject.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'exclude': 'subcategories'})
+        self.assertNotIn('subcategories', response.json()['results'][0])
+        self.assertFalse([query for query in queries if 'questions_subcategory' in query['sql']])
+
+        response = self.client.get(url, {'fields': 'name,subcategories'})
+        [category] = response.json()['results']
+        self.assertEqual(sorted(category), ['name', 'subcategories'])
+        self.assertEqual([subcategory['id'] for subcategory in category['subcategories']], [self.subcategory.id])
+        response = self.client.get(url, {'exclude': 'id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results'][0]['subcategories']), 1)
+
+        response = self.client.get(url, {'fields': 'id,answer'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_responses_are_cached_precompressed(self):
+        import brotli
+        for index in range(20):
+            Group.objects.create(name=f'Group {index}', description='Test Description')
+        url = reverse('group-list')
+        expected = self.client.get(url).json()
+
+        for encoding, decompress in (('gzip', gzip.decompress), ('br', brotli.decompress)):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertTrue(response['ETag'].startswith('W/'))
+            self.assertEqual(json.loads(decompress(response.content)), expected)
+
+            with self.assertNumQueries(0), mock.patch('questions.compression.compress', side_effect=AssertionError):
+                cached = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+            self.assertEqual(cached.content, response.content)
+
+    def test_short_list_responses_are_cached_for_every_encoding(self):
+        from django.core.cache import cache
+        url = reverse('subcategory-list-by-category', kwargs={'category_id': self.category.id})
+        for encoding in ('gzip', 'br'):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+            self.assertNotIn('Content-Encoding', response)
+            with self.assertNumQueries(0), mock.patch('questions.compression.cache.get', wraps=cache.get) as get:
+                cached = self.client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+            self.assertEqual(cached.content, response.content)
+            # Only the entry for the requested encoding is read.
+            keys = [call.args[0] for call in get.call_args_list if call.args[0].startswith('view:')]
+            self.assertEqual([key.rsplit(':', 1)[1] for key in keys], [encoding])
+
+    def test_taxonomy_tree_snapshot(self):
+        url = reverse('taxonomy-tree')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        group = response.json()['groups'][0]
+        self.assertEqual(group['subjects'][0]['categories'][0]['subcategories'][0]['name'], 'Test SubCategory')
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.group.name = 'Renamed Group'
+        self.group.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['groups'][0]['name'], 'Renamed Group')
+
     def test_subject_list(self):
         url = reverse('subject-list')
         response = self.client.get(url)
@@ -59,7 +331,7 @@ class QuestionsAPITestCase(APITestCase):
         url = reverse('subject-view', kwargs={'group_id': self.group.id})
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.data), 1)
+        self.assertGreaterEqual(len(response.json()), 1)
 
     def test_category_list_all(self):
         url = reverse('category-list-all')
@@ -108,8 +380,8 @@ class QuestionsAPITestCase(APITestCase):
         }
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('session_id', response.data)
-        self.assertIn('question', response.data)
+        self.assertIn('session_id', response.json())
+        self.assertIn('question', response.json())
 
     def test_question_get_next_without_session(self):
         url = reverse('question-list')
@@ -121,6 +393,271 @@ class QuestionsAPITestCase(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_question_session_serves_each_question_once(self):
+        from django.contrib.sessions.models import Session
+        second = Question.objects.create(
+            group=self.group, subject=self.subject, category=self.category,
+            level='easy', type='mcq', metadata={'question': 'What is 3+3?'}
+        )
+        url = reverse('question-list')
+        response = self.client.post(url, {'group_id': self.group.id, 'subject_id': self.subject.id}, format='json')
+        session_id = response.json()['session_id']
+        served = {response.json()['question']['id']}
+
+        response = self.client.get(url, HTTP_X_SESSION_ID=session_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        served.add(response.json()['id'])
+        self.assertEqual(served, {self.question.id, second.id})
+
+        response = self.client.get(url, HTTP_X_SESSION_ID=session_id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Session.objects.exists())
+
+        self.client.delete(url, HTTP_X_SESSION_ID=session_id)
+        response = self.client.get(url, HTTP_X_SESSION_ID=session_id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_question_session_walks_whole_pool(self):
+        for _ in range(20):
+            Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq')
+        url = reverse('question-list')
+        response = self.client.post(url, {'group_id': self.group.id, 'subject_id': self.subject.id}, format='json')
+        session_id = response.json()['session_id']
+        served = [response.json()['question']['id']]
+        while True:
+            response = self.client.get(url, HTTP_X_SESSION_ID=session_id)
+            if response.status_code != status.HTTP_200_OK:
+                break
+            served.append(response.json()['id'])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(sorted(served), list(Question.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_question_session_gives_up_on_deleted_questions(self):
+        from .payload_cache import PayloadCache
+        for _ in range(5):
+            Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq')
+        url = reverse('question-list')
+        session_id = self.client.post(url, {'group_id': self.group.id, 'subject_id': self.subject.id}, format='json').json()['session_id']
+        with mock.patch.object(PayloadCache, 'get_many', return_value={}) as get_many:
+            response = self.client.get(url, HTTP_X_SESSION_ID=session_id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(get_many.call_count, 3)
+
+    def test_question_session_metadata_filter(self):
+        Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq', metadata={'answer': '6'})
+        url = reverse('question-list')
+        response = self.client.post(url, {'group_id': self.group.id, 'subject_id': self.subject.id, 'metadata': {'answer': '4'}}, format='json')
+        self.assertEqual(response.json()['question']['id'], self.question.id)
+        session_id = response.json()['session_id']
+        # The metadata match memoised by the start is reused.
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_X_SESSION_ID=session_id)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(url, {'group_id': self.group.id, 'subject_id': self.subject.id, 'metadata': ['answer']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_question_batch_mode_returns_next_questions(self):
+        for _ in range(5):
+            Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq')
+        url = reverse('question-list')
+        response = self.client.post(url, {'group_id': self.group.id, 'subject_id': self.subject.id}, format='json')
+        session_id = response.json()['session_id']
+
+        response = self.client.get(url + '?count=3', HTTP_X_SESSION_ID=session_id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_batch = [question['id'] for question in response.json()['questions']]
+        self.assertEqual(len(first_batch), 3)
+
+        response = self.client.get(url + '?count=3', HTTP_X_SESSION_ID=session_id)
+        second_batch = [question['id'] for question in response.json()['questions']]
+        self.assertEqual(len(second_batch), 2)
+        self.assertFalse(set(first_batch) & set(second_batch))
+
+        response = self.client.get(url + '?count=0', HTTP_X_SESSION_ID=session_id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_questions_by_ids(self):
+        second = Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq')
+        url = reverse('questions-by-ids')
+        missing_id = second.id + 1000
+        response = self.client.get(url, {'ids': f'{second.id},{missing_id},{self.question.id}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([question['id'] for question in response.json()['results']], [second.id, self.question.id])
+        self.assertEqual(response.json()['missing'], [missing_id])
+
+        with self.assertNumQueries(0):
+            response = self.client.post(url, {'ids': [self.question.id, second.id]}, format='json')
+        self.assertEqual([question['id'] for question in response.json()['results']], [self.question.id, second.id])
+
+        for ids in ('a,b', '99999999999999999999', '0', str(2 ** 63)):
+            response = self.client.get(url, {'ids': ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'ids': str(2 ** 63 - 1)})
+        self.assertEqual(response.json()['missing'], [2 ** 63 - 1])
+        response = self.client.post(url, {'ids': list(range(1, 502))}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_question_detail_dashboard_serves_cached_payload(self):
+        url = reverse('question-detail-dashboard-view', kwargs={'question_id': self.question.id})
+        response = self.client.get(url)
+        self.assertEqual(response.json()['category'], 'Test Category')
+
+        self.category.name = 'Renamed Category'
+        self.category.save()
+        self.question.level = 'advance'
+        self.question.save()
+        response = self.client.get(url)
+        self.assertEqual(response.json()['category'], 'Renamed Category')
+        self.assertEqual(response.json()['level'], 'advance')
+
+        missing = reverse('question-detail-dashboard-view', kwargs={'question_id': self.question.id + 1000})
+        self.assertEqual(self.client.get(missing).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(url.replace(str(self.question.id), '9' * 20)).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_metadata_beyond_64_bit_integers_renders(self):
+        big = Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq', metadata={'answer': 2 ** 70})
+        response = self.client.get(reverse('question-detail-dashboard-view', kwargs={'question_id': big.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['metadata'], {'answer': 2 ** 70})
+        response = self.client.get(reverse('recent-questions-view'))
+        self.assertEqual(json.loads(response.content)['results'][0]['metadata'], {'answer': 2 ** 70})
+
+    def test_question_payloads_follow_taxonomy_renames_only(self):
+        from .payload_cache import payload_cache
+        version = payload_cache.taxonomy_version()
+        groups_etag = self.client.get(reverse('group-list'))['ETag']
+
+        category = Category.objects.get(pk=self.category.pk)
+        with self.assertNumQueries(1):
+            category.save()
+        self.client.post(reverse('group-list'), {'name': 'New Group'}, format='json')
+        self.group.description = 'Edited'
+        self.group.save()
+        self.assertEqual(payload_cache.taxonomy_version(), version)
+        self.assertNotEqual(self.client.get(reverse('group-list'))['ETag'], groups_etag)
+
+        category.name = 'Renamed Category'
+        category.save()
+        self.assertNotEqual(payload_cache.taxonomy_version(), version)
+        version = payload_cache.taxonomy_version()
+        SubCategory.objects.get(pk=self.subcategory.pk).delete()
+        self.assertNotEqual(payload_cache.taxonomy_version(), version)
+
+    def test_access_token_does_not_repeat_questions_across_sessions(self):
+        from users.authentication import AuthenticatedStudent
+        from users.models import AccessToken
+        token = AccessToken.objects.create(description='Class 10')
+        self.client.force_authenticate(user=AuthenticatedStudent(token), token=token)
+        url = reverse('question-list')
+        filters = {'group_id': self.group.id, 'subject_id': self.subject.id}
+
+        first = self.client.post(url, filters, format='json')
+        self.assertEqual(first.json()['question']['id'], self.question.id)
+        second = self.client.post(url, filters, format='json')
+        self.assertIsNone(second.json()['question'])
+
+        self.client.delete(url + '?forget_seen=true', HTTP_X_SESSION_ID=second.json()['session_id'])
+        third = self.client.post(url, filters, format='json')
+        self.assertEqual(third.json()['question']['id'], self.question.id)
+
+    def test_quiz_seen_bits_are_tested_in_redis(self):
+        from .quiz_state import QuizStateStore
+        from users.authentication import AuthenticatedStudent
+        from users.models import AccessToken
+        for _ in range(39):
+            Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq')
+        token = AccessToken.objects.create(description='Class 10')
+        self.client.force_authenticate(user=AuthenticatedStudent(token), token=token)
+        url = reverse('question-list')
+        filters = {'group_id': self.group.id, 'subject_id': self.subject.id}
+
+        response = self.client.post(url, filters, format='json')
+        session_id = response.json()['session_id']
+        first = response.json()['question']['id']
+        with mock.patch.object(QuizStateStore, 'seen', autospec=True, side_effect=QuizStateStore.seen) as seen:
+            response = self.client.get(url + '?count=19', HTTP_X_SESSION_ID=session_id)
+        seen.assert_not_called()
+        served = [first] + [question['id'] for question in response.json()['questions']]
+        self.assertNotIn('seen', QuizStateStore().load(session_id))
+
+        # A second run over the same token's history skips the 20 seen ids.
+        response = self.client.post(url, filters, format='json')
+        served.append(response.json()['question']['id'])
+        response = self.client.get(url + '?count=19', HTTP_X_SESSION_ID=response.json()['session_id'])
+        served += [question['id'] for question in response.json()['questions']]
+        self.assertEqual(sorted(served), list(Question.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_question_counts_follow_writes(self):
+        url = reverse('question-counts')
+        params = {'group_id': self.group.id, 'subject_id': self.subject.id}
+        self.assertEqual(self.client.get(url, params).data['total'], 1)
+
+        self.client.post(reverse('question_upload'), [{
+            'group': self.group.name, 'subject': self.subject.name, 'category': self.category.name,
+            'level': 'medium', 'type': 'mcq', 'metadata': {},
+        }], format='json')
+        response = self.client.get(url, params)
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['levels'], {'easy': 1, 'medium': 1})
+        self.assertEqual(response.data['subcategories'], {self.subcategory.id: 1})
+
+        self.question.level = 'medium'
+        self.question.save()
+        self.assertEqual(self.client.get(url, {**params, 'levels': 'medium'}).data['total'], 2)
+
+        self.question.delete()
+        self.assertEqual(self.client.get(url, params).data['total'], 1)
+
+        QuestionCount.objects.all().update(count=0)
+        call_command('rebuild_question_counts', stdout=StringIO())
+        self.assertEqual(self.client.get(url, params).data['total'], 1)
+
+    def test_partially_loaded_questions_save_and_delete(self):
+        self.assertEqual([q.id for q in Question.objects.only('id')], [self.question.id])
+        url = reverse('question-counts')
+        params = {'group_id': self.group.id, 'subject_id': self.subject.id}
+
+        question = Question.objects.only('id', 'type').get(pk=self.question.pk)
+        self.assertEqual(question.level, 'easy')
+        question.level = 'medium'
+        question.save()
+        self.assertEqual(self.client.get(url, {**params, 'levels': 'medium'}).data['total'], 1)
+        self.assertEqual(Question.objects.get(pk=question.pk).group_name, self.group.name)
+
+        Question.objects.only('id').get(pk=question.pk).delete()
+        self.assertEqual(self.client.get(url, params).data['total'], 0)
+
+    def test_question_start_session_fails_fast_without_questions(self):
+        url = reverse('question-list')
+        response = self.client.post(url, {'group_id': self.group.id, 'subject_id': self.subject.id, 'levels': ['advance']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_quiz_pack_is_built_once_and_rebuilt_on_change(self):
+        url = reverse('quiz-pack')
+        params = {'group_id': self.group.id, 'subject_id': self.subject.id}
+        self.assertEqual(APIClient().get(url, params).status_code, status.HTTP_401_UNAUTHORIZED)
+        with tempfile.TemporaryDirectory() as root, override_settings(QUIZ_PACK_ROOT=root):
+            response = self.client.get(url, params, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            pack = json.loads(gzip.decompress(response.content))
+            self.assertEqual([question['id'] for question in pack['questions']], [self.question.id])
+            etag = response['ETag']
+
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            with override_settings(QUIZ_PACK_ACCEL_REDIRECT=True):
+                response = self.client.get(url, params)
+            self.assertEqual(response['X-Accel-Redirect'], f'/internal/quiz-packs/{etag.strip(chr(34))}.json')
+
+            self.question.metadata = {'question': 'What is 3+3?'}
+            self.question.save()
+            response = self.client.get(url, params)
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertEqual(response.json()['questions'][0]['metadata'], {'question': 'What is 3+3?'})
+
     def test_bulk_question_upload(self):
         url = reverse('question_upload')
         data = [
@@ -137,6 +674,92 @@ class QuestionsAPITestCase(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_json_question_upload_is_all_or_nothing(self):
+        url = reverse('question_upload')
+        row = {'group': self.group.name, 'subject': self.subject.name, 'category': self.category.name, 'level': 'medium', 'type': 'mcq'}
+        response = self.client.post(url, [row, {**row, 'group': 'Nope'}, {**row, 'subcategory': 'Nope'}, {**row, 'level': None}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {
+            "message": "Upload failed. Please fix the errors.",
+            "Failed find: ": 3,
+            "failed_items": [
+                {"row": 3, "errors": {"group": "Group 'Nope' not found."}},
+                {"row": 4, "errors": {"subcategory": "SubCategory 'Nope' not found."}},
+                {"row": 5, "errors": {"level": "This field is required."}},
+            ],
+        })
+        self.assertFalse(Question.objects.filter(level='medium').exists())
+
+        response = self.client.post(url, [row, {**row, 'subcategory': self.subcategory.name, 'metadata': ['a']}, {**row, 'type': ''}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {"message": "Successfully uploaded 3 questions."})
+        self.assertEqual(
+            sorted(Question.objects.filter(level='medium').values_list('subcategory_name', 'type', 'metadata'), key=str),
+            sorted([(None, 'mcq', {}), (self.subcategory.name, 'mcq', ['a']), (None, '', {})], key=str),
+        )
+
+    def test_streaming_question_upload(self):
+        url = reverse('question_upload')
+        row = {'group': self.group.name, 'subject': self.subject.name, 'category': self.category.name, 'level': 'medium', 'type': 'mcq'}
+        lines = [json.dumps({**row, 'metadata': {'question': 'Streamed?'}}), json.dumps({**row, 'category': 'Nope'}), 'not json', json.dumps(row)]
+        response = self.client.post(url, '\n'.join(lines), content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item['row'] for item in response.data['failed_items']], [3, 4])
+        self.assertEqual(Question.objects.filter(category=self.category, level='medium').count(), 2)
+
+        body = 'group,subject,category,subcategory,level,type,metadata\n'
+        body += f'{self.group.name},{self.subject.name},{self.category.name},{self.subcategory.name},advance,mcq,"{{""answer"": ""A""}}"\n'
+        response = self.client.post(url, body, content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Question.objects.get(level='advance').metadata, {'answer': 'A'})
+
+        # As saved by Excel, with a byte order mark.
+        response = self.client.post(url, b'\xef\xbb\xbf' + body.replace('advance', 'easy').encode(), content_type='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Question.objects.filter(level='easy', metadata={'answer': 'A'}).count(), 1)
+
+    def test_background_import_job(self):
+        row = {'group': self.group.name, 'subject': self.subject.name, 'category': self.category.name, 'level': 'medium', 'type': 'mcq'}
+        lines = [json.dumps(row), json.dumps({**row, 'category': 'Nope'}), json.dumps(row)]
+        with tempfile.TemporaryDirectory() as root, override_settings(IMPORT_JOB_ROOT=root):
+            response = self.client.post(reverse('import-job-list'), '\n'.join(lines) + '\n', content_type='application/x-ndjson')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual((response.data['status'], response.data['total_rows']), ('pending', 3))
+            self.assertFalse(Question.objects.filter(level='medium').exists())
+
+            out = StringIO()
+            call_command('run_import_jobs', once=True, stdout=out)
+            self.assertIn('succeeded: 2 created, 1 failed of 3 rows', out.getvalue())
+            job = self.client.get(response['Location']).data
+            self.assertEqual((job['status'], job['progress'], job['created_rows']), ('succeeded', 100.0, 2))
+            self.assertEqual([error['row'] for error in job['errors']], [3])
+            self.assertEqual(Question.objects.filter(level='medium').count(), 2)
+            self.assertEqual(list(Path(root).iterdir()), [])
+
+            # A job whose worker stopped sending heartbeats is claimed again
+            # and resumes after its last committed chunk.
+            response = self.client.post(reverse('import-job-list'), '\n'.join(lines), content_type='application/x-ndjson')
+            ImportJob.objects.filter(pk=response.data['id']).update(
+                status='running', attempts=1, processed_rows=2, created_rows=1, failed_rows=1,
+                heartbeat_at=timezone.now() - timedelta(hours=1),
+            )
+            job = import_jobs.run_next()
+            self.assertEqual((job.status, job.attempts, job.created_rows, job.processed_rows), ('succeeded', 2, 2, 3))
+            self.assertEqual(Question.objects.filter(level='medium').count(), 3)
+            self.assertIsNone(import_jobs.run_next())
+
+            # Failed jobs delete their upload too.
+            response = self.client.post(reverse('import-job-list'), '\n'.join(lines), content_type='application/x-ndjson')
+            with mock.patch('questions.bulk_import.import_stream', side_effect=RuntimeError('boom')), self.assertLogs('questions.import_jobs', 'ERROR'):
+                self.assertEqual(import_jobs.run_next().status, 'failed')
+            response = self.client.post(reverse('import-job-list'), '\n'.join(lines), content_type='application/x-ndjson')
+            ImportJob.objects.filter(pk=response.data['id']).update(attempts=settings.IMPORT_JOB_MAX_ATTEMPTS)
+            self.assertEqual(import_jobs.run_next().status, 'failed')
+            self.assertEqual(list(Path(root).iterdir()), [])
+
+        response = self.client.post(reverse('import-job-list'), json.dumps([row]), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
     def test_permissions_read_only_for_non_admin(self):
         # Switch to regular user
         self.client.force_authenticate(user=self.regular_user)
@@ -151,5 +774,112 @@ class QuestionsAPITestCase(APITestCase):
         url = reverse('group-list')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('results', response.data)
-        self.assertLessEqual(len(response.data['results']), 10)  # page_size=10
+        self.assertIn('results', response.json())
+        self.assertEqual(response.json()['count'], 16)
+        self.assertLessEqual(len(response.json()['results']), 20)  # page_size=20
+
+    def test_async_taxonomy_lists_match_sync(self):
+        for i in range(3):
+            Group.objects.create(name=f'Group {i}')
+        sync_response = self.client.get(reverse('category-detail-view', args=[self.subject.id]))
+        async_response = self.client.get(reverse('async-category-detail-view', args=[self.subject.id]))
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+        response = self.client.get(reverse('async-group-list'), {'page_size': 2, 'page': 2})
+        self.assertEqual(response.json()['count'], 4)
+        self.assertEqual([group['name'] for group in response.json()['results']], ['Group 2', 'Test Group'])
+        self.assertIsNone(response.json()['next'])
+
+        response = self.client.get(reverse('async-subject-view', args=[999999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_taxonomy_lists_are_cached_conditional_and_throttled(self):
+        from django.core.cache import cache
+        from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+        for i in range(10):
+            Group.objects.create(name=f'Group {i}', description='Test Description')
+        url = reverse('async-group-list')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag.lstrip('W/')).status_code, status.HTTP_304_NOT_MODIFIED)
+        Group.objects.create(name='Another Group')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).json()['count'], 12)
+
+        self.client.force_authenticate(user=None)
+        ip = '10.20.30.40'
+        cache.delete_many([f'throttle_anon_{ip}', f'throttle_user_{ip}'])
+        with mock.patch.object(AnonRateThrottle, 'THROTTLE_RATES', {'anon': '1/minute'}), \
+                mock.patch.object(UserRateThrottle, 'THROTTLE_RATES', {'user': '100/minute'}):
+            self.assertEqual(self.client.get(url, REMOTE_ADDR=ip).status_code, status.HTTP_200_OK)
+            response = self.client.get(url, REMOTE_ADDR=ip)
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertIn('Retry-After', response)
+            self.assertEqual(self.client.get(reverse('async-question-list'), REMOTE_ADDR=ip).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        cache.delete_many([f'throttle_anon_{ip}', f'throttle_user_{ip}'])
+
+    def test_async_quiz_requires_session_and_credentials(self):
+        self.client.force_authenticate(user=None)
+        url = reverse('async-question-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'group_id': self.group.id, 'subject_id': self.subject.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class QuestionIndexTestCase(TestCase):
+    def setUp(self):
+        from .question_index import QuestionIndex
+        self.index = QuestionIndex()
+        self.group = Group.objects.create(name='Index Group')
+        self.subject = Subject.objects.create(group=self.group, name='Index Subject')
+        self.category = Category.objects.create(group=self.group, subject=self.subject, name='Index Category')
+        self.other_category = Category.objects.create(group=self.group, subject=self.subject, name='Other Category')
+        self.easy = Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq')
+        self.hard = Question.objects.create(group=self.group, subject=self.subject, category=self.other_category, level='advance', type='mcq')
+        self.filters = {'group_id': self.group.id, 'subject_id': self.subject.id}
+
+    def test_candidates_follow_filters(self):
+        self.assertEqual(list(self.index.candidates(self.filters)), [self.easy.id, self.hard.id])
+        self.assertEqual(list(self.index.candidates({**self.filters, 'levels': ['easy']})), [self.easy.id])
+        self.assertEqual(list(self.index.candidates({**self.filters, 'category_ids': [self.other_category.id]})), [self.hard.id])
+        self.assertEqual(list(self.index.candidates({**self.filters, 'subject_id': 'abc'})), [])
+
+    def test_refresh_picks_up_changes(self):
+        self.index.candidates(self.filters)
+        added = Question.objects.create(group=self.group, subject=self.subject, category=self.category, level='easy', type='mcq')
+        self.hard.level = 'easy'
+        self.hard.save()
+        self.easy.delete()
+        self.index.invalidate()
+        self.assertEqual(list(self.index.candidates({**self.filters, 'levels': ['easy']})), [self.hard.id, added.id])
+
+    def test_refresh_picks_up_rows_committed_with_an_older_stamp(self):
+        from .question_index import to_micros
+        newer = timezone.now() + timedelta(seconds=2)
+        Question.objects.filter(pk=self.hard.pk).update(updated_at=newer)
+        self.index.refresh(force=True)
+
+        # Stamped before the newest row but committed after the last refresh.
+        older = newer - timedelta(seconds=1)
+        Question.objects.filter(pk=self.easy.pk).update(updated_at=older, level='advance')
+        self.index.refresh(force=True)
+        self.assertEqual(self.index.updated_at_for([self.easy.id]), {self.easy.id: to_micros(older)})
+        self.assertEqual(list(self.index.candidates({**self.filters, 'levels': ['easy']})), [])
+
+
+class FeistelPermutationTestCase(TestCase):
+    def test_is_a_permutation_of_the_range(self):
+        from .permutation import FeistelPermutation
+        for size in (1, 2, 7, 64, 1000):
+            permutation = FeistelPermutation(size, seed=42)
+            self.assertEqual(sorted(permutation[position] for position in range(size)), list(range(size)))
+
+    def test_depends_on_seed(self):
+        from .permutation import FeistelPermutation
+        first = [FeistelPermutation(100, seed=1)[position] for position in range(100)]
+        second = [FeistelPermutation(100, seed=2)[position] for position in range(100)]
+        self.assertNotEqual(first, second)
@@ -1,7 +1,11 @@
-from .views import GroupViewSet, SubjectViewSet, CategoryViewSet, SubCategoryViewSet, QuestionViewSet, BulkQuestionUploadView, SubjectDetailViewSet, CategoryDetailsViewSet, SubCategoryDetailsViewSet, Home_Dashboard, Question_Dashboard, CategoryListViewSet, QuestionDetail_Dashboard, QuestionWriteViews
+from .views import GroupViewSet, SubjectViewSet, CategoryViewSet, SubCategoryViewSet, QuestionViewSet, BulkQuestionUploadView, SubjectDetailViewSet, CategoryDetailsViewSet, SubCategoryDetailsViewSet, Home_Dashboard, Question_Dashboard, CategoryListViewSet, QuestionDetail_Dashboard, QuestionWriteViews, QuestionCountView, QuizPackView, TaxonomyTreeView, QuestionExportView, QuestionsByIdsView, ImportJobView, ImportJobDetailView
 from django.urls import path , include
+from django.views.decorators.csrf import csrf_exempt
+from . import async_views
 
 urlpatterns = [
+    path('taxonomy/tree/', TaxonomyTreeView.as_view(), name='taxonomy-tree'),
+
     path('groups/', GroupViewSet.as_view(), name='group-list'),
 
     # subject views
@@ -20,14 +24,27 @@ urlpatterns = [
 
     # question views
     path('questions/', QuestionViewSet.as_view(), name='question-list'),
+    path('questions/counts/', QuestionCountView.as_view(), name='question-counts'),
+    path('questions/pack/', QuizPackView.as_view(), name='quiz-pack'),
+    path('questions/by-ids/', QuestionsByIdsView.as_view(), name='questions-by-ids'),
     path('upload-questions/', BulkQuestionUploadView.as_view(), name='question_upload'),
+    path('upload-questions/jobs/', ImportJobView.as_view(), name='import-job-list'),
+    path('upload-questions/jobs/<int:job_id>/', ImportJobDetailView.as_view(), name='import-job-detail'),
     path('question/create/', QuestionWriteViews.as_view(), name='question-create'),
 
     # Dashboard
     path('dashboard/', Home_Dashboard.as_view(), name='dashboard-view'),
 
     path('dashboard/recent-questions/', Question_Dashboard.as_view(), name='recent-questions-view'),
+    path('dashboard/questions/export/', QuestionExportView.as_view(), name='question-export'),
     
     path('dashboard/question/<int:question_id>/', QuestionDetail_Dashboard.as_view(), name='question-detail-dashboard-view'),
+
+    # Async (ASGI) read path
+    path('async/groups/', async_views.group_list, name='async-group-list'),
+    path('async/subject/<int:group_id>/', async_views.subject_list, name='async-subject-view'),
+    path('async/categories/<int:subject_id>/', async_views.category_list, name='async-category-detail-view'),
+    path('async/subcategories/<int:category_id>/', async_views.subcategory_list, name='async-subcategory-list-by-category'),
+    path('async/questions/', csrf_exempt(async_views.AsyncQuestionView.as_view()), name='async-question-list'),
     
 ]
\ No newline at end of file
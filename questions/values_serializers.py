@@ -0,0 +1,228 @@
+"""
+Read-only serializers that build rows straight from ``values_list()``.
+
+A DRF ``ModelSerializer`` instantiates a model per row and walks a field
+object per column. The classes here declare ``(output name, lookup)`` pairs
+once; a page is fetched as plain tuples and each row becomes a dict with a
+single ``zip``, with only the datetime columns converted (formatted exactly
+like DRF's ``DateTimeField`` under ``REST_FRAMEWORK['DATETIME_FORMAT']``).
+The output is identical to the ``ModelSerializer`` each class mirrors.
+
+List views opt in with ``ValuesListMixin`` and ``values_serializer_class``;
+large pages are streamed row by row. ``manage.py benchmark_serializers``
+compares the two paths.
+"""
+import datetime
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from .models import Category, Question, SubCategory
+from .pagination import KeysetPagination
+from .renderers import stream_json
+
+
+def datetime_formatter():
+    """A function rendering a datetime like ``serializers.DateTimeField`` does right now."""
+    output_format = api_settings.DATETIME_FORMAT
+    field_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def enforce_timezone(value):
+        if field_timezone is not None:
+            if timezone.is_aware(value):
+                return value.astimezone(field_timezone)
+            return timezone.make_aware(value, field_timezone)
+        if timezone.is_aware(value):
+            return timezone.make_naive(value, datetime.timezone.utc)
+        return value
+
+    if output_format is None:
+        return lambda value: value or None
+    if output_format.lower() == ISO_8601:
+        def format_datetime(value):
+            if not value:
+                return None
+            value = enforce_timezone(value).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return format_datetime
+    return lambda value: enforce_timezone(value).strftime(output_format) if value else None
+
+
+@lru_cache(maxsize=256)
+def _narrowed(serializer, chosen):
+    return type(serializer.__name__, (serializer,), {
+        'fields': tuple(pair for pair in serializer.fields if pair[0] in chosen),
+        'datetime_fields': tuple(name for name in serializer.datetime_fields if name in chosen),
+        'nested': tuple(name for name in serializer.nested if name in chosen),
+    })
+
+
+class ValuesSerializer:
+    model = None
+    fields = ()  # (output name, values() lookup), in output order
+    datetime_fields = ()
+    nested = ()  # output names filled in by iterate() from other queries
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.names = tuple(name for name, _ in cls.fields)
+        cls.lookups = tuple(lookup for _, lookup in cls.fields)
+        cls.datetime_positions = tuple(cls.names.index(name) for name in cls.datetime_fields)
+
+    @classmethod
+    def values(cls, queryset, extra=()):
+        """
+        ``queryset`` as named rows of the declared lookups followed by any
+        ``extra`` ones (such as the keyset pagination columns).
+        """
+        lookups = cls.lookups + tuple(lookup for lookup in extra if lookup not in cls.lookups)
+        return queryset.prefetch_related(None).values_list(*(lookups or ('id',)), named=True)
+
+    @classmethod
+    def select(cls, fields=None, exclude=None):
+        """
+        This serializer narrowed to the output names in ``fields`` minus those
+        in ``exclude``, so only their columns are fetched. Raises ValueError
+        naming any unknown field.
+        """
+        available = cls.names + cls.nested
+        unknown = [name for name in (*(fields or ()), *(exclude or ())) if name not in available]
+        if unknown:
+            raise ValueError(unknown)
+        chosen = tuple(name for name in available if (not fields or name in fields) and name not in (exclude or ()))
+        return cls if chosen == available else _narrowed(cls, chosen)
+
+    @classmethod
+    def row_converter(cls):
+        """A function turning one row from ``values()`` into the output dict."""
+        names, positions = cls.names, cls.datetime_positions
+        if not positions:
+            return lambda row: dict(zip(names, row))
+        format_datetime = datetime_formatter()
+
+        def convert(row):
+            row = list(row)
+            for position in positions:
+                row[position] = format_datetime(row[position])
+            return dict(zip(names, row))
+        return convert
+
+    @classmethod
+    def iterate(cls, rows):
+        """The output dicts for ``rows``, one at a time."""
+        return map(cls.row_converter(), rows)
+
+    @classmethod
+    def serialize(cls, rows):
+        return list(cls.iterate(rows))
+
+
+class QuestionListValues(ValuesSerializer):
+    """``QuestionListSerializer``."""
+    model = Question
+    fields = (
+        ('id', 'id'), ('group', 'group_name'), ('subject', 'subject_name'), ('category', 'category_name'),
+        ('subcategory', 'subcategory_name'), ('level', 'level'), ('type', 'type'), ('created_at', 'created_at'),
+        ('metadata', 'metadata'), ('updated_at', 'updated_at'),
+    )
+    datetime_fields = ('created_at', 'updated_at')
+
+
+class QuestionDetailValues(ValuesSerializer):
+    """``QuestionDetailSerializer``."""
+    model = Question
+    fields = (
+        ('id', 'id'), ('group', 'group_name'), ('subject', 'subject_name'), ('category', 'category_name'),
+        ('subcategory', 'subcategory_name'), ('level', 'level'), ('type', 'type'), ('metadata', 'metadata'),
+        ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+    )
+    datetime_fields = ('created_at', 'updated_at')
+
+
+class SubCategoryReadValues(ValuesSerializer):
+    """``SubCategoryReadSerializer``."""
+    model = SubCategory
+    fields = (
+        ('id', 'id'), ('name', 'name'), ('category', 'category__name'), ('subject', 'subject__name'),
+        ('group', 'group__name'), ('created_at', 'created_at'),
+    )
+    datetime_fields = ('created_at',)
+
+
+class CategoryReadValues(ValuesSerializer):
+    """``CategoryReadSerializer``, with the nested subcategories fetched in one query per page."""
+    model = Category
+    fields = (
+        ('id', 'id'), ('name', 'name'), ('subject', 'subject__name'), ('group', 'group_id'),
+        ('created_at', 'created_at'),
+    )
+    datetime_fields = ('created_at',)
+    nested = ('subcategories',)
+
+    @classmethod
+    def values(cls, queryset, extra=()):
+        return super().values(queryset, extra=(*extra, 'id') if cls.nested else extra)
+
+    @classmethod
+    def iterate(cls, rows):
+        if not cls.nested:
+            yield from super().iterate(rows)
+            return
+        rows = list(rows)
+        subcategories = defaultdict(list)
+        if rows:
+            nested = SubCategory.objects.filter(category_id__in=[row.id for row in rows])
+            convert_nested = SubCategoryReadValues.row_converter()
+            for row in SubCategoryReadValues.values(nested, extra=('category_id',)):
+                subcategories[row.category_id].append(convert_nested(row))
+        # Keyed on the row, which always carries id; the output may not.
+        convert = cls.row_converter()
+        for row in rows:
+            item = convert(row)
+            item['subcategories'] = subcategories[row.id]
+            yield item
+
+
+class ValuesListMixin:
+    """
+    ``list()`` through ``values_serializer_class`` instead of the view's DRF
+    serializer. ``?fields=a,b`` and ``?exclude=c`` pick the output fields, and
+    only their columns (and nested queries) are read. Pages of at least
+    ``STREAMING_MIN_PAGE_SIZE`` rows requested as JSON are streamed (see
+    ``renderers.stream_json``).
+    """
+    values_serializer_class = None
+
+    def get_values_serializer(self):
+        params = self.request.query_params
+        fields, exclude = (
+            [name for value in params.getlist(param) for name in value.split(',') if name] or None
+            for param in ('fields', 'exclude')
+        )
+        try:
+            return self.values_serializer_class.select(fields, exclude)
+        except ValueError as exc:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(exc.args[0])}."})
+
+    def should_stream(self, request, page):
+        return len(page) >= settings.STREAMING_MIN_PAGE_SIZE and request.accepted_renderer.format == 'json'
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_values_serializer()
+        ordering = getattr(self, 'keyset_ordering', None) or KeysetPagination.ordering
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = serializer.values(queryset, extra=[field.lstrip('-') for field in ordering])
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            if self.should_stream(request, page):
+                envelope = self.get_paginated_response([]).data
+                return StreamingHttpResponse(stream_json(envelope, serializer.iterate(page)), content_type='application/json')
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(rows))
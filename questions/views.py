@@ -1,36 +1,65 @@
-from .models import Group, Subject, Category, SubCategory, Question
-from .serializers import GroupSerializer, SubjectSerializer, CategoryWriteSerializer,CategoryReadSerializer, SubCategoryReadSerializer, SubCategoryWriteSerializer, QuestionDetailSerializer, QuestionListSerializer, CategoryListSerializer
+from .models import Group, Subject, Category, SubCategory, Question, QuestionCount, ImportJob
+from .serializers import GroupSerializer, SubjectSerializer, CategoryWriteSerializer,CategoryReadSerializer, SubCategoryReadSerializer, SubCategoryWriteSerializer, QuestionDetailSerializer, QuestionListSerializer, CategoryListSerializer, ImportJobSerializer
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveUpdateDestroyAPIView, RetrieveUpdateDestroyAPIView
+from .pagination import StandardResultsSetPagination, CursorOrPageNumberPagination, EstimatedCountPagination
+from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveAPIView, RetrieveUpdateDestroyAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.views import APIView
 from .permissions import IsAdminOrReadOnly
-from django.contrib.sessions.backends.db import SessionStore
+from .question_index import question_index
+from .quiz_state import filter_hash, quiz_state
+from .payload_cache import payload_cache, json_response, json_list, parse_question_id
+from . import bulk_import, compression, export, import_jobs, quiz_packs
+from .generations import GenerationCachedListMixin, TAXONOMY_MODELS, TAXONOMY_NAMES
+from .conditional import ConditionalListMixin
+from .values_serializers import ValuesListMixin, CategoryReadValues, SubCategoryReadValues, QuestionListValues
+from .search import QuestionSearchFilter
+from .metadata import MetadataFilter, clean_metadata_filters
+from .taxonomy_tree import taxonomy_tree
+from users.models import AccessToken
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
-from django.core.cache import cache 
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
 from django.db import transaction
-from rest_framework.permissions import IsAdminUser
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.urls import reverse
+from django.utils.http import parse_etags
+import gzip
+import json
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
 # from rest_framework.permissions import IsAuthenticatedOrReadOnly
 # from users.authentication import TokenAuthentication, AuthenticatedStudent
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 100
+class TaxonomyTreeView(APIView):
+    throttle_classes = [UserRateThrottle, AnonRateThrottle]
+
+    def get(self, request, *args, **kwargs):
+        snapshot = taxonomy_tree.get()
+        etag = snapshot.etag
+        if_none_match = {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}
+        if etag in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            encoding = compression.accepted_encoding(request)
+            response = compression.encoded_response(snapshot.encoded(encoding), 'application/json', encoding)
+            if encoding != 'identity':
+                etag = f'W/{etag}'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
 
 # Group View
 
-@method_decorator(cache_page(60 * 15), name='dispatch')  # Cache for 15 minutes
-class GroupViewSet(ListCreateAPIView):
+class GroupViewSet(ConditionalListMixin, GenerationCachedListMixin, ListCreateAPIView):
+    cache_models = (Group,)
     queryset = Group.objects.all().order_by('name')
     serializer_class = GroupSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = [IsAdminOrReadOnly]
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
 
@@ -40,27 +69,15 @@ class GroupViewSet(ListCreateAPIView):
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
-    
-    def get_queryset(self):
-        cache_key = 'groups_list'
-        queryset = cache.get(cache_key)
-        
-        if not queryset:
-            queryset = Group.objects.all().order_by('name')
-            cache.set(cache_key, list(queryset), 60 * 15)  # Cache for 15 minutes
-            
-        return queryset
-    
-    def perform_create(self, serializer):
-        super().perform_create(serializer)
-        cache.delete('groups_list')
-    
+
 # Subject View
 
-class SubjectViewSet(ListCreateAPIView):
+class SubjectViewSet(ConditionalListMixin, GenerationCachedListMixin, ListCreateAPIView):
+    cache_models = (Group, Subject)
     queryset = Subject.objects.select_related('group').all().order_by('group__name','name')
     serializer_class = SubjectSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = [IsAdminOrReadOnly]
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -76,9 +93,11 @@ class SubjectViewSet(ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class SubjectDetailViewSet(ListAPIView):
+class SubjectDetailViewSet(ConditionalListMixin, GenerationCachedListMixin, ListAPIView):
+    cache_models = (Group, Subject)
     serializer_class = SubjectSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = [IsAdminOrReadOnly]
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
 
@@ -89,9 +108,12 @@ class SubjectDetailViewSet(ListAPIView):
     
 # Category View
 
-class CategoryViewSet(ListCreateAPIView):
+class CategoryViewSet(ConditionalListMixin, GenerationCachedListMixin, ValuesListMixin, ListCreateAPIView):
+    cache_models = TAXONOMY_MODELS
+    values_serializer_class = CategoryReadValues
     queryset = Category.objects.select_related('subject','group').prefetch_related('subcategories').all().order_by('name')
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = [IsAdminOrReadOnly]
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -111,9 +133,12 @@ class CategoryViewSet(ListCreateAPIView):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class CategoryDetailsViewSet(ListAPIView):
+class CategoryDetailsViewSet(ConditionalListMixin, GenerationCachedListMixin, ValuesListMixin, ListAPIView):
+    cache_models = TAXONOMY_MODELS
+    values_serializer_class = CategoryReadValues
     serializer_class = CategoryReadSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = [IsAdminOrReadOnly]
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
 
@@ -122,9 +147,11 @@ class CategoryDetailsViewSet(ListAPIView):
         subject = get_object_or_404(Subject, id=subject_id)
         return Category.objects.select_related('subject','group').prefetch_related('subcategories').filter(subject=subject).order_by('name')
     
-class CategoryListViewSet(ListAPIView):
+class CategoryListViewSet(ConditionalListMixin, GenerationCachedListMixin, ListAPIView):
+    cache_models = (Group, Subject, Category)
     serializer_class = CategoryListSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = [IsAdminOrReadOnly]
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -137,8 +164,11 @@ class CategoryListViewSet(ListAPIView):
 
 #  SubCategory 
 
-class SubCategoryViewSet(ListCreateAPIView):
-    pagination_class = StandardResultsSetPagination
+class SubCategoryViewSet(ConditionalListMixin, GenerationCachedListMixin, ValuesListMixin, ListCreateAPIView):
+    cache_models = TAXONOMY_MODELS
+    values_serializer_class = SubCategoryReadValues
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = [IsAdminOrReadOnly]
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -159,9 +189,12 @@ class SubCategoryViewSet(ListCreateAPIView):
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class SubCategoryDetailsViewSet(ListAPIView):
+class SubCategoryDetailsViewSet(ConditionalListMixin, GenerationCachedListMixin, ValuesListMixin, ListAPIView):
+    cache_models = TAXONOMY_MODELS
+    values_serializer_class = SubCategoryReadValues
     serializer_class = SubCategoryReadSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = CursorOrPageNumberPagination
+    keyset_ordering = ('name', 'id')
     permission_classes = [IsAdminOrReadOnly]
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
 
@@ -172,29 +205,12 @@ class SubCategoryDetailsViewSet(ListAPIView):
 
 #Question View 
 
-QUIZ_BATCH_SIZE = 50
+QUIZ_MAX_COUNT = 50
+# Claims per request when claimed questions were deleted before being read.
+QUIZ_FETCH_ATTEMPTS = 3
 class QuestionViewSet(APIView):
     throttle_classes = [UserRateThrottle, AnonRateThrottle]
     
-    def get_base_queryset(self, filters):
-        group_id = filters.get('group_id')
-        subject_id = filters.get('subject_id')
-        category_ids = filters.get('category_ids', [])
-        subcategory_ids = filters.get('subcategory_ids', [])
-        levels = filters.get('levels', [])
-
-        queryset = Question.objects.select_related('group', 'subject','category','subcategory').filter(group_id = group_id, subject_id = subject_id)
-
-        if levels:
-            queryset = queryset.filter(level__in=levels)
-
-        if subcategory_ids:
-            queryset = queryset.filter(subcategory__id__in = subcategory_ids)
-        elif category_ids:
-            queryset = queryset.filter(category__id__in = category_ids)
-        
-        return queryset
-    
     def post(self, request, *args, **kwargs):
 
         filters = {
@@ -207,142 +223,169 @@ class QuestionViewSet(APIView):
 
         if not filters['group_id'] or not filters['subject_id']:
             return Response({"errors": "Selecting a group and at least one subject is mandatory."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        s = SessionStore()
-        s.create()
-
-        s['question_filter'] = filters 
-        s['seen_question_ids'] = []
-        s['question_batch'] = []
-        s.save()
+        filters.update(clean_metadata_filters(request.data))
 
-        queryset = self.get_base_queryset(filters)
-        new_batch_ids = list(queryset.order_by('?').values_list('id', flat=True)[:QUIZ_BATCH_SIZE])
+        token_key = request.auth.key if isinstance(request.auth, AccessToken) else None
+        pool = question_index.candidates(filters, cache_key=filter_hash(filters))
+        if not len(pool):
+            return Response({'errors': "No questions are available for your selection."}, status=status.HTTP_404_NOT_FOUND)
+        session_id, state = quiz_state.create(filters, len(pool), token_key=token_key)
 
-        first_question_data = None
-
-        if new_batch_ids:
-            question_id = new_batch_ids.pop(0)
-            s['seen_question_ids'] = [question_id]
-            s['question_batch'] = new_batch_ids
-            s.save()
-            try:
-                question_obj = queryset.get(id=question_id)
-                serializer = QuestionDetailSerializer(question_obj)
-                first_question_data = serializer.data
-            except Question.DoesNotExist:
-                first_question_data = None
+        question_ids = quiz_state.advance(session_id, state, pool)
+        payloads = payload_cache.get_many(question_ids)
+        first_question_data = payloads.get(question_ids[0], b'null') if question_ids else b'null'
 
-        return Response({
-            'session_id': s.session_key,
-            'question': first_question_data
-        }, status=status.HTTP_200_OK)
+        return json_response(b'{"session_id":"%s","question":%s}' % (session_id.encode(), first_question_data))
     
 
     
     def get(self, request, *args, **kwargs):
-        filters = request.session.get('question_filter')
+        session_id = request.quiz_session_id
+        state = quiz_state.load(session_id)
 
-        if not filters:
+        if not state:
             return Response({'errors': "There is no active question this section." }, status=status.HTTP_400_BAD_REQUEST)
 
-        question_batch = request.session.get('question_batch', [])
+        count = request.query_params.get('count')
+        if count is not None:
+            try:
+                count = int(count)
+            except ValueError:
+                count = 0
+            if not 1 <= count <= QUIZ_MAX_COUNT:
+                return Response({'errors': f"count must be between 1 and {QUIZ_MAX_COUNT}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = state['filters']
+        pool = question_index.candidates(filters, cache_key=state['filter_hash'])
+        for _attempt in range(QUIZ_FETCH_ATTEMPTS):
+            question_ids = quiz_state.advance(session_id, state, pool, count=count or 1)
+            if not question_ids:
+                break
+            payloads = payload_cache.get_many(question_ids)
+            if count is not None:
+                return json_response(b'{"questions":%s}' % json_list([payloads[question_id] for question_id in question_ids if question_id in payloads]))
+            if question_ids[0] in payloads:
+                return json_response(payloads[question_ids[0]])
+
+        return Response({'errors': "No more new questions are available for your selection."}, status=status.HTTP_404_NOT_FOUND)
+    
+    def delete(self, request, *args, **kwargs):
+        forget_seen = request.query_params.get('forget_seen', '').lower() in ('1', 'true')
+        quiz_state.clear(request.quiz_session_id, forget_seen=forget_seen)
+        return Response({'message': "Question session has been reset."}, status=status.HTTP_200_OK)
 
-        if not question_batch:
+class FilterQueryMixin:
+    def get_id_list(self, name):
+        values = []
+        for value in self.request.query_params.getlist(name):
+            values.extend(part for part in value.split(',') if part)
+        return values
 
-            seen_ids = request.session.get('seen_question_ids', [])
 
-            queryset = self.get_base_queryset(filters)
+class QuestionCountView(FilterQueryMixin, APIView):
+    throttle_classes = [UserRateThrottle, AnonRateThrottle]
 
-            new_batch_ids = list(queryset.exclude(id__in = seen_ids).order_by('?').values_list('id', flat=True)[:QUIZ_BATCH_SIZE])
+    def get(self, request, *args, **kwargs):
+        group_id = request.query_params.get('group_id')
+        subject_id = request.query_params.get('subject_id')
+        if not group_id or not subject_id:
+            return Response({"errors": "Selecting a group and at least one subject is mandatory."}, status=status.HTTP_400_BAD_REQUEST)
 
-            if not new_batch_ids:
-                return Response({'errors': "No more new questions are available for your selection."}, status=status.HTTP_404_NOT_FOUND)
-                
-            question_batch = new_batch_ids
+        category_ids = self.get_id_list('category_ids')
+        subcategory_ids = self.get_id_list('subcategory_ids')
+        levels = self.get_id_list('levels')
 
-            request.session['question_batch'] = question_batch
+        try:
+            counts = QuestionCount.objects.filter(group_id=group_id, subject_id=subject_id, count__gt=0)
+            if levels:
+                counts = counts.filter(level__in=levels)
+            if subcategory_ids:
+                counts = counts.filter(subcategory_id__in=subcategory_ids)
+            elif category_ids:
+                counts = counts.filter(category_id__in=category_ids)
+            rows = list(counts.values_list('category_id', 'subcategory_id', 'level', 'count'))
+        except (ValueError, DjangoValidationError):
+            return Response({"errors": "Invalid id in filter."}, status=status.HTTP_400_BAD_REQUEST)
+
+        levels_total, categories_total, subcategories_total = {}, {}, {}
+        for category_id, subcategory_id, level, count in rows:
+            levels_total[level] = levels_total.get(level, 0) + count
+            categories_total[category_id] = categories_total.get(category_id, 0) + count
+            if subcategory_id is not None:
+                subcategories_total[subcategory_id] = subcategories_total.get(subcategory_id, 0) + count
 
-        question_id = question_batch.pop(0)
-        request.session['question_batch'] = question_batch
-        seen_ids = request.session.get('seen_question_ids', [])
-        seen_ids.append(question_id)
-        request.session['seen_question_ids'] = seen_ids
+        return Response({
+            'total': sum(row[3] for row in rows),
+            'levels': levels_total,
+            'categories': categories_total,
+            'subcategories': subcategories_total,
+        }, status=status.HTTP_200_OK)
+
+
+class QuizPackView(FilterQueryMixin, APIView):
+    # Packs hold whole payloads, answers included: the same audience as the
+    # quiz POST, not anonymous readers.
+    permission_classes = [IsAuthenticated]
+    throttle_classes = [UserRateThrottle, AnonRateThrottle]
+
+    def get(self, request, *args, **kwargs):
+        filters = {
+            'group_id': request.query_params.get('group_id'),
+            'subject_id': request.query_params.get('subject_id'),
+            'category_ids': self.get_id_list('category_ids'),
+            'subcategory_ids': self.get_id_list('subcategory_ids'),
+            'levels': self.get_id_list('levels'),
+        }
+        if not filters['group_id'] or not filters['subject_id']:
+            return Response({"errors": "Selecting a group and at least one subject is mandatory."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            question = self.get_base_queryset(filters).get(id=question_id)
-        except Question.DoesNotExist:
-            return self.get(request, *args, **kwargs)
-        
-        serializer = QuestionDetailSerializer(question)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    
-    def delete(self, request, *args, **kwargs):
-        keys_to_delete = ['question_filter', 'seen_question_ids', 'question_batch']
-        for key in keys_to_delete:
-            if key in request.session:
-                del request.session[key]
-        return Response({'message': "Question session has been reset."}, status=status.HTTP_200_OK)
+            pack = quiz_packs.get_pack(filters)
+        except quiz_packs.PackTooLarge:
+            return Response({"errors": f"Packs are limited to {settings.QUIZ_PACK_MAX_QUESTIONS} questions. Please narrow your selection."}, status=status.HTTP_400_BAD_REQUEST)
+        if not pack.count:
+            return Response({'errors': "No questions are available for your selection."}, status=status.HTTP_404_NOT_FOUND)
+
+        if pack.etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        elif settings.QUIZ_PACK_ACCEL_REDIRECT:
+            response = HttpResponse(content_type='application/json')
+            response['X-Accel-Redirect'] = pack.accel_redirect
+        else:
+            content = pack.path.read_bytes()
+            response = HttpResponse(content_type='application/json')
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response['Content-Encoding'] = 'gzip'
+            else:
+                content = gzip.decompress(content)
+            response.content = content
+
+        response['ETag'] = pack.etag
+        response['Cache-Control'] = f'private, max-age={settings.QUIZ_PACK_MAX_AGE}'
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
 
 class BulkQuestionUploadView(APIView):
+    """
+    A JSON list is imported all or nothing. NDJSON and CSV bodies are streamed
+    in chunks, keeping the valid rows (see ``bulk_import.py``).
+    """
     permission_classes = [IsAdminOrReadOnly]
+    stream_parsers = {'application/x-ndjson': bulk_import.iter_ndjson, 'text/csv': bulk_import.iter_csv}
+
     def post(self, request, *args, **kwargs):
+        parse = self.stream_parsers.get(request.content_type.split(';')[0].strip().lower())
+        if parse is not None:
+            return self.post_stream(request, parse)
 
         if not isinstance(request.data, list):
             return Response({"error": "Expected a list of items."}, status=status.HTTP_400_BAD_REQUEST)
         if not request.data:
             return Response({"message": "No data provided."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        group_names = {item.get('group') for item in request.data if item.get('group')}
-        subject_lookups = {(item.get('group'), item.get('subject')) for item in request.data}
-        category_lookups = {(item.get('group'), item.get('subject'), item.get('category')) for item in request.data}
-        subcategory_lookups = {(item.get('group'), item.get('subject'), item.get('category'), item.get('subcategory')) for item in request.data if item.get('subcategory')}
-
-
-        groups = Group.objects.filter(name__in=group_names)
-        subjects = Subject.objects.select_related('group').filter(group__name__in={l[0] for l in subject_lookups}, name__in={l[1] for l in subject_lookups})
-        categories = Category.objects.select_related('group', 'subject').filter(group__name__in={l[0] for l in category_lookups}, subject__name__in={l[1] for l in category_lookups}, name__in={l[2] for l in category_lookups})
-        subcategories = SubCategory.objects.select_related('group', 'subject', 'category').filter(group__name__in={l[0] for l in subcategory_lookups}, subject__name__in={l[1] for l in subcategory_lookups}, category__name__in={l[2] for l in subcategory_lookups}, name__in={l[3] for l in subcategory_lookups})
-
-        groups_map = {g.name: g for g in groups}
-        subjects_map = {(s.group.name, s.name): s for s in subjects}
-        categories_map = {(c.group.name, c.subject.name, c.name): c for c in categories}
-        subcategories_map = {(sc.group.name, sc.subject.name, sc.category.name, sc.name): sc for sc in subcategories}
-        
-        questions_to_create = []
-        errors = []
-
-        for index, item_data in enumerate(request.data):
-            group_name = item_data.get('group')
-            subject_name = item_data.get('subject')
-            category_name = item_data.get('category')
-            subcategory_name = item_data.get('subcategory')
-
-            group = groups_map.get(group_name)
-            if not group:
-                errors.append({"row": index + 2, "errors": {"group": f"Group '{group_name}' not found."}})
-                continue
-            subject = subjects_map.get((group_name, subject_name))
-            if not subject:
-                errors.append({"row": index + 2, "errors": {"subject": f"Subject '{subject_name}' not found in group '{group_name}'."}})
-                continue
-            category = categories_map.get((group_name, subject_name, category_name))
-            if not category:
-                errors.append({"row": index + 2, "errors": {"category": f"Category '{category_name}' not found."}})
-                continue
-
-            subcategory = None
-            if subcategory_name:
-                subcategory = subcategories_map.get((group_name, subject_name, category_name, subcategory_name))
-                if not subcategory:
-                    errors.append({"row": index + 2, "errors": {"subcategory": f"SubCategory '{subcategory_name}' not found."}})
-                    continue
-            
-            questions_to_create.append(Question(
-                group=group, subject=subject, category=category, subcategory=subcategory,
-                level=item_data.get('level'), type=item_data.get('type'), metadata=item_data.get('metadata', {})
-            ))
-        
+
+        taxonomy = bulk_import.resolve_taxonomy(request.data)
+        questions_to_create, errors = bulk_import.build_questions(enumerate(request.data), taxonomy)
 
         if errors:
             return Response({
@@ -356,23 +399,64 @@ class BulkQuestionUploadView(APIView):
 
         if questions_to_create:
             try:
-                created_questions = Question.objects.bulk_create(questions_to_create)
+                created_questions = Question.objects.bulk_create(questions_to_create, batch_size=bulk_import.IMPORT_BATCH_SIZE)
             except Exception as e:
                 return Response({"error": f"An error occurred during database operation: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-        response_data = {
-            "message": f"Successfully uploaded {len(created_questions)} out of {len(request.data)} questions."
-        }
 
         return Response({
             "message": f"Successfully uploaded {len(created_questions)} questions."
         }, status=status.HTTP_201_CREATED)
 
+    def post_stream(self, request, parse):
+        if request.stream is None:
+            return Response({"message": "No data provided."}, status=status.HTTP_400_BAD_REQUEST)
+        report = bulk_import.import_stream(parse(request.stream))
+        if not report.total:
+            return Response({"message": "No data provided."}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {"message": f"Successfully uploaded {report.created} out of {report.total} questions."}
+        if not report.failed:
+            return Response(data, status=status.HTTP_201_CREATED)
+        data.update({"Failed find: ": report.failed, "failed_items": report.errors})
+        return Response(data, status=status.HTTP_207_MULTI_STATUS if report.created else status.HTTP_400_BAD_REQUEST)
+
+
+class ImportJobView(ListAPIView):
+    """
+    ``POST`` an NDJSON or CSV upload (the streaming formats of
+    ``upload-questions/``) to import it in the background: the body is stored
+    and a pending job returned at once (202), for ``manage.py run_import_jobs``
+    to pick up. ``GET`` lists recent jobs.
+    """
+    permission_classes = [IsAdminUser]
+    serializer_class = ImportJobSerializer
+    pagination_class = StandardResultsSetPagination
+    queryset = ImportJob.objects.all()
+    formats = {'application/x-ndjson': 'ndjson', 'text/csv': 'csv'}
+
+    def post(self, request, *args, **kwargs):
+        format = self.formats.get(request.content_type.split(';')[0].strip().lower())
+        if format is None:
+            return Response({"error": "Send the questions as application/x-ndjson or text/csv."}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        job = import_jobs.enqueue(request.stream, format, user=request.user) if request.stream is not None else None
+        if job is None:
+            return Response({"message": "No data provided."}, status=status.HTTP_400_BAD_REQUEST)
+        response = Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = reverse('import-job-detail', args=[job.pk])
+        return response
+
+
+class ImportJobDetailView(RetrieveAPIView):
+    """Status, row counts and errors of one import job; poll it until ``status`` is ``succeeded`` or ``failed``."""
+    permission_classes = [IsAdminUser]
+    serializer_class = ImportJobSerializer
+    queryset = ImportJob.objects.all()
+    lookup_url_kwarg = 'job_id'
+
 
 
 # Dashboard 
 
-from users.models import AccessToken
 from django.contrib.auth.models import User
 
 class Home_Dashboard(APIView):
@@ -403,20 +487,44 @@ class Home_Dashboard(APIView):
 
 from rest_framework.generics import ListAPIView
 
-class Question_Dashboard(ListAPIView):
+class Question_Dashboard(ConditionalListMixin, GenerationCachedListMixin, ValuesListMixin, ListAPIView):
+    cache_models = (TAXONOMY_NAMES, Question)
+    values_serializer_class = QuestionListValues
     permission_classes = [IsAdminUser]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = EstimatedCountPagination
     serializer_class = QuestionListSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    ordering_fields = ['created_at', 'group__name', 'subject__name', 'category__name', 'subcategory__name']
+    filter_backends = [DjangoFilterBackend, QuestionSearchFilter, MetadataFilter, filters.OrderingFilter]
+    ordering_fields = ['created_at', 'group_name', 'subject_name', 'category_name', 'subcategory_name', 'group__name', 'subject__name', 'category__name', 'subcategory__name']
     search_fields = ['group__name', 'subject__name', 'category__name', 'subcategory__name', 'metadata', 'type', 'level', 'id']
     filterset_fields = ['level', 'type', 'group__id', 'subject__id', 'category__id', 'subcategory__id']
 
     def get_queryset(self):
-        questions = Question.objects.select_related('group', 'subject', 'category', 'subcategory').all().order_by('-created_at')
+        questions = Question.objects.all().order_by('-created_at')
         return questions
 
 
+class QuestionExportView(ValuesListMixin, ListAPIView):
+    """Every question matching the dashboard filters, streamed as NDJSON (see ``export.py``)."""
+    values_serializer_class = QuestionListValues
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+    filter_backends = Question_Dashboard.filter_backends
+    ordering_fields = Question_Dashboard.ordering_fields
+    search_fields = Question_Dashboard.search_fields
+    filterset_fields = Question_Dashboard.filterset_fields
+
+    def get_queryset(self):
+        return Question.objects.order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(export.ndjson(queryset, serializer=self.get_values_serializer()), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="questions.ndjson"'
+        # Let nginx pass chunks through instead of buffering the export.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 # Question Detail Dashboard View
 # Question get and patch view for admin and delete view
 
@@ -426,7 +534,9 @@ from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 class QuestionDetail_Dashboard(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAdminUser]
     parser_classes = [JSONParser, MultiPartParser, FormParser]
-    queryset = Question.objects.select_related('group', 'subject', 'category', 'subcategory').all()
+    # The search document is only read inside the database; saving the
+    # instance refreshes it anyway (signals.index_saved_question).
+    queryset = Question.objects.defer('search_document')
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return QuestionWriteSerializer
@@ -435,6 +545,51 @@ class QuestionDetail_Dashboard(RetrieveUpdateDestroyAPIView):
     lockup_field = 'id'
     lookup_url_kwarg = 'question_id'
 
+    def retrieve(self, request, *args, **kwargs):
+        question_id = parse_question_id(self.kwargs[self.lookup_url_kwarg])
+        payload = payload_cache.get_many([question_id]).get(question_id) if question_id is not None else None
+        if payload is None:
+            return Response({'detail': 'No Question matches the given query.'}, status=status.HTTP_404_NOT_FOUND)
+        return json_response(payload)
+
+
+QUESTIONS_BY_IDS_MAX = 500
+
+
+class QuestionsByIdsView(APIView):
+    """
+    Several questions in one round trip: ``GET ?ids=3,1,2`` or ``POST {"ids": [...]}``
+    for long lists. Payloads come from ``payload_cache`` (anything not cached is
+    rendered with one primary-key query), in the requested order, and ids that
+    do not exist are listed under ``missing``.
+    """
+    permission_classes = [IsAdminUser]
+    throttle_classes = [UserRateThrottle, AnonRateThrottle]
+
+    def get(self, request, *args, **kwargs):
+        ids = [part for value in request.query_params.getlist('ids') for part in value.split(',') if part]
+        return self.questions(ids)
+
+    def post(self, request, *args, **kwargs):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list):
+            return Response({"errors": "ids must be a list of question ids."}, status=status.HTTP_400_BAD_REQUEST)
+        return self.questions(ids)
+
+    def questions(self, ids):
+        ids = list(dict.fromkeys(parse_question_id(question_id) for question_id in ids))
+        if None in ids:
+            return Response({"errors": "ids must be positive integers below 2**63."}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({"errors": "Provide at least one id."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > QUESTIONS_BY_IDS_MAX:
+            return Response({"errors": f"At most {QUESTIONS_BY_IDS_MAX} ids per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        payloads = payload_cache.get_many(ids)
+        missing = [question_id for question_id in ids if question_id not in payloads]
+        results = json_list([payloads[question_id] for question_id in ids if question_id in payloads])
+        return json_response(b'{"results":%s,"missing":%s}' % (results, json.dumps(missing).encode()))
+
 
 class QuestionWriteViews(APIView):
     permission_classes = [IsAdminUser]
@@ -46,4 +46,34 @@ class TokenAuthentication(BaseAuthentication):
         return (student, token)
 
     def authenticate_header(self, request):
-        return self.keyword
\ No newline at end of file
+        return self.keyword
+
+
+async def aauthenticate(request):
+    """
+    Resolve the ``AccessKey`` or DRF ``Token`` Authorization header for async
+    (non-DRF) views. Returns ``(user, auth)``, or ``(None, None)`` without
+    credentials, and raises ``AuthenticationFailed`` for invalid ones.
+    """
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if not key:
+        return None, None
+
+    if keyword == TokenAuthentication.keyword:
+        try:
+            token = await AccessToken.objects.aget(key=key, is_active=True)
+        except AccessToken.DoesNotExist:
+            raise AuthenticationFailed("Ungültiges oder inaktives Token.")
+        return AuthenticatedStudent(token=token), token
+
+    if keyword == 'Token':
+        from rest_framework.authtoken.models import Token
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            raise AuthenticationFailed("Invalid token.")
+        if not token.user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+        return token.user, token
+
+    return None, None
@@ -0,0 +1,16 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from questions import generations
+
+from .models import AccessToken
+
+
+@receiver([post_save, post_delete], sender=AccessToken)
+@receiver([post_save, post_delete], sender=User)
+def bump_generation(sender, **kwargs):
+    # Fingerprints the conditional list endpoints (questions/conditional.py).
+    generations.bump(sender)
+    transaction.on_commit(lambda: generations.bump(sender))
@@ -316,6 +316,25 @@ class AccessTokenIntegrationTestCase(APITestCase):
         self.assertGreaterEqual(token.created_at, before_creation)
         self.assertLessEqual(token.created_at, after_creation)
 
+    def test_token_list_conditional_get(self):
+        """Test that an unchanged token list answers 304 and a new token changes its ETag"""
+        admin = User.objects.create_superuser('admin', 'admin@test.com', 'password')
+        self.client.force_authenticate(user=admin)
+        url = reverse('list-tokens')
+        AccessToken.objects.create(description="Listed")
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        AccessToken.objects.create(description="Another")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+
 
 class AccessTokenEdgeCaseTestCase(APITestCase):
     """Test edge cases and boundary conditions"""
@@ -12,6 +12,7 @@ from rest_framework.generics import ListAPIView
 from questions.views import StandardResultsSetPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter, SearchFilter
+from questions.conditional import ConditionalListMixin
 
 
 
@@ -42,7 +43,8 @@ class GenerateAccessTokenView(APIView):
             token = AccessToken.objects.create()
         return Response({"key": token.key}, status=status.HTTP_201_CREATED)
     
-class List_Of_AccessTokens(ListAPIView):
+class List_Of_AccessTokens(ConditionalListMixin, ListAPIView):
+    cache_models = (AccessToken,)
     permission_classes = [IsAdminUser]  
     serializer_class = AccessTokenSerializer
     pagination_class = StandardResultsSetPagination
@@ -97,7 +99,8 @@ class DeleteAccessTokenView(APIView):
 # User  
 
 from rest_framework.exceptions import PermissionDenied
-class UserViewSet(ModelViewSet):
+class UserViewSet(ConditionalListMixin, ModelViewSet):
+    cache_models = (User,)
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]